@@ -0,0 +1,250 @@
+# core/binary_memory.py
+
+import os
+import logging
+import threading
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+VOTE_LIMIT = np.iinfo(np.int16).max  # Unweighted vote counters saturate at +/- this value
+
+_POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1, dtype=np.uint8)
+
+
+def _popcount_table(packed):
+    """Number of set bits of every byte of a packed array, looked up in a 256-entry table."""
+    return _POPCOUNT_TABLE[packed]
+
+
+popcount = getattr(np, "bitwise_count", _popcount_table)  # np.bitwise_count needs NumPy >= 2.0
+
+
+def to_bits(vectors, dimensions):
+    """
+    Binarize real vectors (1D or 2D) by sign: positive entries become 1, the rest 0.
+    Shorter vectors are zero-padded (their padding binarizes to 0) and longer ones truncated.
+    """
+    vectors = np.asarray(vectors, dtype=float)[..., :dimensions]
+    bits = np.zeros(vectors.shape[:-1] + (dimensions,), dtype=bool)
+    bits[..., :vectors.shape[-1]] = vectors > 0
+    return bits
+
+
+def pack(bits):
+    """Pack boolean hypervectors (1D or 2D) into uint8 bytes along the last axis."""
+    return np.packbits(bits, axis=-1)
+
+
+def hamming_similarity(packed_a, packed_b, dimensions):
+    """
+    Bipolar similarity of packed hypervectors from the popcount of their XOR:
+    1 for identical vectors, 0 for unrelated ones and -1 for complements. Broadcasts over leading axes.
+    :param dimensions: Number of meaningful bits per vector (excludes packing padding).
+    """
+    distance = popcount(np.bitwise_xor(packed_a, packed_b)).sum(axis=-1, dtype=np.int64)
+    return 1 - 2 * distance / dimensions
+
+
+class BinaryHolographicMemory:
+    backend = "binary"
+    dtype = "binary"  # Single storage format (used by the memory registry key)
+
+    def __init__(self, dimensions=16384, memory_file="data/binary_memory.npz", autosave_every=1, seed=0):
+        """
+        Associative memory over binary hypervectors (binary spatter codes), a drop-in alternative to
+        HolographicMemory. Keys and values are binarized by sign, bound with XOR and bundled by a
+        (weighted) majority vote. Retrieval XORs the packed trace with the packed key, so a 16384-dimension
+        lookup touches 2 KB instead of a 256 KB complex spectrum.
+        :param dimensions: Number of bits per hypervector.
+        :param memory_file: .npz path to save/load the vote counts.
+        :param autosave_every: Save after this many pending writes (None disables autosave).
+        :param seed: Seed of the fixed tie-break vector used where the vote is even.
+        """
+        self.dimensions = dimensions
+        self.memory_file = memory_file
+        self.autosave_every = autosave_every
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._pending_writes = 0
+        self._packed = None  # Packed majority trace, rebuilt lazily after writes
+        self._tie_break = np.random.default_rng(seed).random(dimensions) < 0.5
+
+        if os.path.exists(memory_file):
+            logging.info(f"Loading binary memory from {memory_file}...")
+            with np.load(memory_file) as stored:
+                self.votes = stored["votes"]
+            if self.votes.shape != (dimensions,):
+                raise ValueError(f"{memory_file} holds {self.votes.shape[0]} dimensions, expected {dimensions}.")
+            # Older files keep float32 votes; whole counts in range fit the int16 counters
+            if (self.votes.dtype != np.int16 and np.array_equal(self.votes, np.rint(self.votes))
+                    and np.abs(self.votes).max(initial=0) <= VOTE_LIMIT):
+                self.votes = self.votes.astype(np.int16)
+        else:
+            logging.info(f"Initializing new binary memory with {dimensions} dimensions.")
+            self.votes = np.zeros(dimensions, dtype=np.int16)
+
+    @property
+    def packed_trace(self):
+        """Majority vote of every stored binding, packed into dimensions / 8 bytes."""
+        with self._lock:
+            if self._packed is None:
+                bits = np.where(self.votes == 0, self._tie_break, self.votes > 0)
+                self._packed = pack(bits)
+            return self._packed
+
+    @property
+    def nbytes(self):
+        """Bytes held by the trace (vote counts plus the packed majority)."""
+        return self.votes.nbytes + self.packed_trace.nbytes
+
+    def _add_votes(self, delta):
+        """
+        Add a vote delta to the counters. Whole-number deltas saturate the int16 counters at
+        +/- VOTE_LIMIT; fractional ones (weighted votes) switch the counters to float32 for good.
+        """
+        if self.votes.dtype == np.int16 and np.issubdtype(delta.dtype, np.integer):
+            total = self.votes.astype(np.int32) + delta
+            self.votes = np.clip(total, -VOTE_LIMIT, VOTE_LIMIT).astype(np.int16)
+        else:
+            self.votes = self.votes.astype(np.float32) + delta
+        self._packed = None
+        self._dirty = True
+
+    def encode(self, key, value, regularization=0.0):
+        """
+        Bind a key-value pair with XOR and add it to the majority vote.
+        :param key: Key vector (1D array, binarized by sign).
+        :param value: Value vector (1D array, binarized by sign).
+        :param regularization: Extra vote weight, as in HolographicMemory (weight = 1 + regularization).
+        """
+        self.encode_many([key], [value], regularization)
+
+    def encode_many(self, keys, values, regularization=0.0):
+        """
+        Bind and bundle a batch of key-value pairs in one vectorized pass.
+        :param keys: Key vectors (2D array, one key per row).
+        :param values: Value vectors (2D array, one value per row).
+        :param regularization: Regularization factor (scalar or one value per row).
+        """
+        keys = to_bits(np.atleast_2d(keys), self.dimensions)
+        values = to_bits(np.atleast_2d(values), self.dimensions)
+        if keys.shape[0] != values.shape[0]:
+            raise ValueError(f"Got {keys.shape[0]} keys but {values.shape[0]} values.")
+        bipolar = np.where(keys ^ values, 1, -1).astype(np.int8)
+        weights = 1 + np.broadcast_to(np.asarray(regularization, dtype=np.float32), (keys.shape[0],))
+        if np.array_equal(weights, np.rint(weights)):
+            delta = weights.astype(np.int32) @ bipolar
+        else:
+            delta = weights @ bipolar.astype(np.float32)
+        with self._lock:
+            self._add_votes(delta)
+
+    def dynamic_encode(self, key, value, **kwargs):
+        """
+        Encode a key-value pair and apply the autosave policy. Adaptive regularization does not
+        apply to majority-vote bundling, so every pair gets one vote; kwargs are accepted for
+        compatibility with HolographicMemory.dynamic_encode.
+        """
+        self.encode(key, value)
+        with self._lock:
+            self._pending_writes += 1
+            if self.autosave_every is not None and self._pending_writes >= self.autosave_every:
+                self.save_memory()
+
+    def dynamic_encode_many(self, keys, values, **kwargs):
+        """
+        Encode a batch of key-value pairs and apply the autosave policy once.
+        """
+        keys = np.atleast_2d(keys)
+        self.encode_many(keys, values)
+        with self._lock:
+            self._pending_writes += len(keys)
+            if self.autosave_every is not None and self._pending_writes >= self.autosave_every:
+                self.save_memory()
+
+    def forget_many(self, keys, values, **kwargs):
+        """
+        Withdraw the votes of previously encoded key-value pairs and apply the autosave policy once.
+        This exactly undoes their encoding unless a counter saturated at +/- VOTE_LIMIT in between:
+        the votes past the limit were dropped, so that counter ends up closer to zero than the votes
+        still stored (and may flip its majority bit early).
+        """
+        keys = to_bits(np.atleast_2d(keys), self.dimensions)
+        values = to_bits(np.atleast_2d(values), self.dimensions)
+        if keys.shape[0] != values.shape[0]:
+            raise ValueError(f"Got {keys.shape[0]} keys but {values.shape[0]} values.")
+        with self._lock:
+            self._add_votes(-np.where(keys ^ values, 1, -1).sum(axis=0, dtype=np.int32))
+            self._pending_writes += len(keys)
+            if self.autosave_every is not None and self._pending_writes >= self.autosave_every:
+                self.save_memory()
+
+    def retrieve(self, key, **kwargs):
+        """
+        Retrieve the value bound to a key.
+        :param key: Input key vector (1D array).
+        :param kwargs: HolographicMemory retrieval options (denoise, retrieval); not used here.
+        :return: Retrieved bipolar value vector (1D array of +1/-1).
+        """
+        return self.retrieve_many(np.atleast_2d(key))[0]
+
+    def retrieve_many(self, keys, **kwargs):
+        """
+        Retrieve the values bound to a batch of keys with one packed XOR.
+        :param keys: Input key vectors (2D array, one key per row).
+        :return: Retrieved bipolar value vectors (2D array, one value per row).
+        """
+        packed_keys = pack(to_bits(np.atleast_2d(keys), self.dimensions))
+        bits = np.unpackbits(packed_keys ^ self.packed_trace, axis=-1, count=self.dimensions)
+        return bits.astype(float) * 2 - 1
+
+    def similarity(self, key, value):
+        """
+        Hamming similarity between the value retrieved for a key and a candidate value.
+        :return: Bipolar similarity in [-1, 1].
+        """
+        packed_keys = pack(to_bits(key, self.dimensions))
+        retrieved = packed_keys ^ self.packed_trace
+        return hamming_similarity(retrieved, pack(to_bits(value, self.dimensions)), self.dimensions)
+
+    def compress_memory(self, threshold=None):
+        """
+        Binary traces are already packed; kept for interface compatibility.
+        :return: Compression ratio (always 1.0).
+        """
+        return 1.0
+
+    def save_memory(self):
+        """
+        Atomically save the vote counts to memory_file.
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(self.memory_file) or ".", exist_ok=True)
+            tmp_file = self.memory_file + ".tmp"
+            with open(tmp_file, "wb") as stored:
+                np.savez(stored, votes=self.votes)
+            os.replace(tmp_file, self.memory_file)
+            self._dirty = False
+            self._pending_writes = 0
+            logging.info(f"Binary memory saved to {self.memory_file}.")
+
+    def flush(self):
+        """
+        Save the trace if it changed since the last save.
+        """
+        if self._dirty:
+            self.save_memory()
+
+    def checkpoint(self):
+        """
+        Save the trace (same as save_memory; there is no log to fold in).
+        """
+        self.save_memory()
+
+    def close(self):
+        """
+        Flush pending changes.
+        """
+        self.flush()
@@ -0,0 +1,97 @@
+# core/connection_pool.py
+
+import logging
+import sqlite3
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ConnectionPool:
+    def __init__(self, db_path, pragmas=None, max_idle=4):
+        """
+        Pool of SQLite connections to one database with per-thread affinity: a thread always gets
+        the same connection, so a connection is never used by two threads at once. Connections of
+        threads that finished (or released theirs) are reused by the next thread that asks.
+        :param db_path: Path of the database file.
+        :param pragmas: Dictionary of PRAGMA name -> value applied to every new connection.
+        :param max_idle: Idle connections kept open for reuse; extra ones are closed.
+        """
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.max_idle = max_idle
+        self._local = threading.local()
+        self._owners = {}  # connection -> thread it is bound to
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def size(self):
+        """Number of open connections (bound and idle)."""
+        with self._lock:
+            return len(self._owners) + len(self._idle)
+
+    def _open(self):
+        # Affinity is enforced by the pool, so connections may be closed from any thread
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def _make_idle(self, conn):
+        """Roll back anything left uncommitted and keep the connection for reuse (or close it)."""
+        if conn.in_transaction:
+            conn.rollback()
+        if len(self._idle) < self.max_idle:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def _reclaim(self):
+        """Take back the connections of threads that have finished."""
+        for conn, thread in list(self._owners.items()):
+            if not thread.is_alive():
+                del self._owners[conn]
+                self._make_idle(conn)
+
+    def connection(self):
+        """
+        Return the calling thread's connection, binding an idle or new one on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Connection pool for {self.db_path} is closed.")
+            self._reclaim()
+            conn = self._idle.pop() if self._idle else self._open()
+            self._owners[conn] = threading.current_thread()
+        self._local.conn = conn
+        return conn
+
+    def release(self):
+        """
+        Return the calling thread's connection to the pool (e.g. before a worker thread goes idle).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if self._owners.pop(conn, None) is not None and not self._closed:
+                self._make_idle(conn)
+
+    def close_all(self):
+        """
+        Close every connection of the pool; later connection() calls raise RuntimeError.
+        """
+        with self._lock:
+            self._closed = True
+            connections = list(self._owners) + self._idle
+            self._owners.clear()
+            self._idle.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,134 @@
+# core/delta_log.py
+
+import os
+import struct
+import zlib
+import hashlib
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+LOG_MAGIC = b"HMDL"
+LOG_VERSION = 1
+# magic, version, digest of the snapshot the log applies on top of
+LOG_HEADER = struct.Struct("<4sI32s")
+# key hash, weight, key length, value length, crc32 of the payload
+RECORD_HEADER = struct.Struct("<16sdIII")
+
+
+def file_digest(path):
+    """
+    Digest of a snapshot file's contents (of b"" if it does not exist).
+    :param path: Path of the snapshot file.
+    :return: 32-byte BLAKE2b digest.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    if os.path.exists(path):
+        with open(path, "rb") as snapshot:
+            for chunk in iter(lambda: snapshot.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.digest()
+
+
+class DeltaLog:
+    def __init__(self, path, base_digest, fsync=False):
+        """
+        Append-only log of encodes applied on top of a base snapshot.
+        :param path: File path of the log.
+        :param base_digest: Digest of the current snapshot; a log written against another snapshot is stale.
+        :param fsync: fsync after every append instead of only flushing to the OS.
+        """
+        self.path = path
+        self.fsync = fsync
+        self.count = 0
+        self._valid_bytes = LOG_HEADER.size
+        self._file = None
+
+        if not self._header_matches(base_digest):
+            if os.path.exists(path):
+                logging.info(f"[DeltaLog] {path} belongs to an older snapshot; discarding it.")
+            self.reset(base_digest)
+        self._file = open(path, "r+b")
+
+    def _header_matches(self, base_digest):
+        """Check that the log exists and was written against the given snapshot."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "rb") as log:
+            header = log.read(LOG_HEADER.size)
+        if len(header) != LOG_HEADER.size:
+            return False
+        magic, version, digest = LOG_HEADER.unpack(header)
+        return magic == LOG_MAGIC and version == LOG_VERSION and digest == base_digest
+
+    def records(self):
+        """
+        Yield the logged encodes in order, stopping at a truncated or corrupt tail.
+        :return: Generator of (key hash, weight, key vector, value vector).
+        """
+        self._file.seek(LOG_HEADER.size)
+        self.count = 0
+        self._valid_bytes = LOG_HEADER.size
+        while True:
+            header = self._file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            key_hash, weight, key_len, value_len, crc = RECORD_HEADER.unpack(header)
+            payload = self._file.read(8 * (key_len + value_len))
+            if len(payload) < 8 * (key_len + value_len) or zlib.crc32(payload) != crc:
+                logging.warning(f"[DeltaLog] Ignoring incomplete record at byte {self._valid_bytes} of {self.path}.")
+                break
+            vectors = np.frombuffer(payload, dtype="<f8")
+            self.count += 1
+            self._valid_bytes += RECORD_HEADER.size + len(payload)
+            yield key_hash, weight, vectors[:key_len], vectors[key_len:]
+        # Drop any partial record so new appends start on a record boundary
+        self._file.truncate(self._valid_bytes)
+
+    def append(self, key, value, weight):
+        """
+        Append one encode to the log.
+        :param key: Key vector (1D array).
+        :param value: Value vector (1D array).
+        :param weight: Total weight the binding was superposed with.
+        """
+        key = np.ascontiguousarray(key, dtype="<f8")
+        value = np.ascontiguousarray(value, dtype="<f8")
+        payload = key.tobytes() + value.tobytes()
+        key_hash = hashlib.blake2b(key.tobytes(), digest_size=16).digest()
+        header = RECORD_HEADER.pack(key_hash, float(weight), key.size, value.size, zlib.crc32(payload))
+        self._file.seek(self._valid_bytes)
+        self._file.write(header + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._valid_bytes += len(header) + len(payload)
+        self.count += 1
+
+    def reset(self, base_digest):
+        """
+        Atomically replace the log with an empty one written against a new snapshot.
+        :param base_digest: Digest of the snapshot the new log applies on top of.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as log:
+            log.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, base_digest))
+            log.flush()
+            os.fsync(log.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(tmp_path, self.path)
+        if self._file is not None:
+            self._file = open(self.path, "r+b")
+        self.count = 0
+        self._valid_bytes = LOG_HEADER.size
+
+    def close(self):
+        """
+        Close the log file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
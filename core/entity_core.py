@@ -7,27 +7,27 @@ import os
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(root_dir)
 
-from memory_store import MemoryStore
+from memory_store import acquire_store  # Shared MemoryStore instances
 from core.learning_engine import LearningEngine
 from core.entanglement_hub import EntanglementHub
 from domains.math_module import MathModule
 from domains.english_module import EnglishModule
 from domains.python_module import PythonModule
 from domains.science_module import ScienceModule
-from core.holographic_memory import HolographicMemory  # Import HolographicMemory
+from core.memory_registry import acquire_memory  # Shared HolographicMemory instances
 
 class SuperEntity:
     def __init__(self, name, meta_entity=None, holographic_memory=None):
         self.name = name
-        self.math_memory = MemoryStore(db_path="data/math.db")
-        self.english_memory = MemoryStore(db_path="data/english.db")
-        self.programming_memory = MemoryStore(db_path="data/programming.db")
-        self.science_memory = MemoryStore(db_path="data/science.db")
+        self.math_memory = acquire_store("data/math.db")
+        self.english_memory = acquire_store("data/english.db")
+        self.programming_memory = acquire_store("data/programming.db")
+        self.science_memory = acquire_store("data/science.db")
         self.learning_engine = LearningEngine(self.math_memory)  # Default to math memory
         self.entanglement_hub = EntanglementHub(self.name)
         
         # Initialize holographic memory if not provided
-        self.holographic_memory = holographic_memory if holographic_memory else HolographicMemory(memory_file=f"data/{name}_holographic_memory.npy")
+        self.holographic_memory = holographic_memory if holographic_memory else acquire_memory(memory_file=f"data/{name}_holographic_memory.npy")
         
         self.modules = {
             "math": MathModule(memory_dimensions=16384, memory_store=self.math_memory),
@@ -0,0 +1,64 @@
+# core/fft_backend.py
+
+import numpy as np
+import scipy.fft
+
+try:
+    import pyfftw  # Optional: FFTW plans with wisdom/plan caching
+    import pyfftw.interfaces.scipy_fft
+except ImportError:
+    pyfftw = None
+
+# Supported FFT backends ("pocketfft" is the C++ library scipy.fft runs on)
+FFT_BACKENDS = ("scipy", "pocketfft", "numpy", "pyfftw")
+
+class FFTExecutor:
+    def __init__(self, backend="scipy", workers=None, plan_sizes=()):
+        """
+        Run the FFTs of a holographic memory with a chosen backend and worker count.
+        :param backend: "scipy"/"pocketfft" (scipy.fft, multithreaded over batch rows),
+                        "numpy" (numpy.fft, single-threaded), or "pyfftw" (needs pyfftw installed).
+        :param workers: Threads per transform (None uses the backend default, -1 uses every core).
+        :param plan_sizes: Transform lengths to plan up front so the cached plans are reused.
+        """
+        if backend not in FFT_BACKENDS:
+            raise ValueError(f"Unknown FFT backend '{backend}'. Use one of {FFT_BACKENDS}.")
+        if backend == "pyfftw" and pyfftw is None:
+            raise ImportError("The 'pyfftw' FFT backend requires the pyfftw package.")
+        self.backend = backend
+        self.workers = workers
+
+        if backend == "pyfftw":
+            pyfftw.interfaces.cache.enable()  # Keep FFTW plans alive between calls
+            self._module = pyfftw.interfaces.scipy_fft
+        elif backend == "numpy":
+            self._module = np.fft
+        else:
+            self._module = scipy.fft
+        for size in plan_sizes:
+            self.prepare(size)
+
+    def _kwargs(self):
+        if self.backend == "numpy" or self.workers is None:
+            return {}
+        return {"workers": self.workers}
+
+    def prepare(self, size):
+        """
+        Build (and cache) the forward and inverse plans for transforms of the given length.
+        """
+        probe = np.zeros(size)
+        self.irfft(self.rfft(probe, n=size), n=size)
+        self.ifft(self.fft(probe, n=size))
+
+    def fft(self, x, n=None, axis=-1):
+        return self._module.fft(x, n=n, axis=axis, **self._kwargs())
+
+    def ifft(self, x, n=None, axis=-1):
+        return self._module.ifft(x, n=n, axis=axis, **self._kwargs())
+
+    def rfft(self, x, n=None, axis=-1):
+        return self._module.rfft(x, n=n, axis=axis, **self._kwargs())
+
+    def irfft(self, x, n=None, axis=-1):
+        return self._module.irfft(x, n=n, axis=axis, **self._kwargs())
@@ -1,43 +1,460 @@
 # core/holographic_memory.py
 
 import numpy as np
-from scipy.fft import fft, ifft
 from scipy.ndimage import gaussian_filter1d
 from scipy.signal import medfilt
+from scipy.fft import next_fast_len
 import os
+import time
 import logging
+import threading
+from contextlib import contextmanager
+from core.delta_log import DeltaLog, file_digest
+from core.fft_backend import FFTExecutor
+
+try:
+    import fcntl  # Advisory file locking (POSIX only)
+except ImportError:
+    fcntl = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Supported precision tiers for the stored spectrum
+MEMORY_DTYPES = ("complex128", "complex64", "int8")
+
+# Denoising pipelines applied to retrieved values
+DENOISE_MODES = ("gaussian+median", "spectral", "spectral-gaussian", "none")
+# Supported unbinding operators for retrieval
+RETRIEVAL_MODES = ("inverse", "correlation", "wiener")
+
+
+def running_median(values, width=3):
+    """
+    Running median along the last axis with zero padding at the edges (same output as medfilt).
+    Width 3 uses a min/max network; other odd widths use a partition over sliding windows.
+    :param values: Input vector (1D array) or batch of vectors (2D array).
+    :param width: Odd window width.
+    :return: Filtered values.
+    """
+    if width == 1:
+        return values
+    half = width // 2
+    padding = [(0, 0)] * (values.ndim - 1) + [(half, half)]
+    padded = np.pad(values, padding)
+    if width == 3:
+        left, center, right = padded[..., :-2], padded[..., 1:-1], padded[..., 2:]
+        return np.maximum(np.minimum(left, center), np.minimum(np.maximum(left, center), right))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width, axis=-1)
+    return np.partition(windows, half, axis=-1)[..., half]
+
 class HolographicMemory:
-    def __init__(self, dimensions=16384, initial_regularization=1e-6, memory_file="data/holographic_memory.npy"):
+    backend = "holographic"
+
+    def __init__(self, dimensions=16384, initial_regularization=1e-6, memory_file="data/holographic_memory.npy",
+                 autosave_every=1, autosave_interval=None, spectrum="full", dtype="complex128",
+                 quantization_block=64, mmap=False, persistence="snapshot", compact_every=1000,
+                 fft_backend="scipy", fft_workers=None, denoise="gaussian+median",
+                 retrieval="inverse", wiener_noise=1.0):
         """
         Initialize holographic memory with a high-dimensional space.
         :param dimensions: Number of dimensions for memory representation.
         :param initial_regularization: Starting regularization value for iterative encoding.
         :param memory_file: File path to save/load the memory space for persistence.
+        :param autosave_every: Save after this many pending writes (None disables the count trigger).
+        :param autosave_interval: Save pending writes once this many seconds passed since the last save, checked
+                                  on every write and retrieval (None disables it).
+        :param spectrum: "full" keeps the complete FFT spectrum, "real" keeps only the non-redundant
+                         rfft half-spectrum (keys and values are real, so nothing is lost).
+        :param dtype: Precision tier of the stored spectrum: "complex128", "complex64", or "int8"
+                      (block-quantized real/imaginary parts with one float32 scale per block).
+        :param quantization_block: Number of spectrum bins sharing a scale in the "int8" tier.
+        :param mmap: Memory-map the trace file so every instance and process using it shares one
+                     physical copy; writes are coordinated with an advisory lock on "<memory_file>.lock".
+        :param persistence: "snapshot" rewrites the trace file on save; "log" appends each dynamic_encode
+                            to "<memory_file>.log" and folds the log into the snapshot on compaction.
+        :param compact_every: Number of logged encodes after which the log is compacted ("log" mode).
+        :param fft_backend: FFT implementation: "scipy", "pocketfft", "numpy" or "pyfftw".
+        :param fft_workers: Threads per FFT (None for the backend default, -1 for every core).
+        :param denoise: Default denoising of retrieved values: "gaussian+median" (spatial filters),
+                        "spectral" (Gaussian window on the spectrum before the inverse FFT, then a fast
+                        running median), "spectral-gaussian" (window only) or "none".
+        :param retrieval: Default unbinding operator: "inverse" (divide by the key spectrum), "correlation"
+                          (multiply by its conjugate) or "wiener" (conjugate over power plus wiener_noise).
+        :param wiener_noise: Noise-to-signal term of the Wiener inverse, relative to the mean power of a
+                             unit key spectrum (1.0); larger values suppress more crosstalk, 0 is the inverse.
         """
+        if spectrum not in ("full", "real"):
+            raise ValueError(f"Unknown spectrum mode '{spectrum}'. Use 'full' or 'real'.")
+        if dtype not in MEMORY_DTYPES:
+            raise ValueError(f"Unknown memory dtype '{dtype}'. Use one of {MEMORY_DTYPES}.")
+        if denoise not in DENOISE_MODES:
+            raise ValueError(f"Unknown denoise mode '{denoise}'. Use one of {DENOISE_MODES}.")
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval}'. Use one of {RETRIEVAL_MODES}.")
+        if persistence not in ("snapshot", "log"):
+            raise ValueError(f"Unknown persistence mode '{persistence}'. Use 'snapshot' or 'log'.")
+        if persistence == "log" and mmap:
+            raise ValueError("Delta-log persistence cannot be combined with a memory-mapped trace.")
         self.dimensions = dimensions
         self.initial_regularization = initial_regularization
         self.memory_file = memory_file
+        self.autosave_every = autosave_every
+        self.autosave_interval = autosave_interval
+        self._dirty = False
+        self._pending_writes = 0
+        self._last_save = time.monotonic()
+        self.spectrum = spectrum
+        self.spectrum_size = dimensions // 2 + 1 if spectrum == "real" else dimensions
+        self.dtype = dtype
+        self.quantization_block = quantization_block
+        self._space = None
+        # "int8" tier: rounding error of this instance's last write, itself block-quantized, carried into
+        # its next write so the errors stay bounded instead of compounding (None when there is none)
+        self._residual = None
+        self._sparse = None  # (indices, values) once compress_memory() has run
+        self.mmap = mmap
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+        self.persistence = persistence
+        self.compact_every = compact_every
+        self._delta_log = None
+        # Plans for the fixed transform length are built once and reused by every encode/retrieve
+        self.fft = FFTExecutor(backend=fft_backend, workers=fft_workers, plan_sizes=(dimensions,))
+        self.denoise = denoise
+        self._gaussian_windows = {}  # sigma -> spectral window
+        self.retrieval = retrieval
+        self.wiener_noise = wiener_noise
 
         # Load memory space from disk if it exists, otherwise initialize to zero
-        if os.path.exists(self.memory_file):
+        if mmap:
+            self._open_mmap()
+        elif os.path.exists(self.memory_file):
             logging.info(f"Loading holographic memory from {self.memory_file}...")
-            self.memory_space = np.load(self.memory_file)
+            stored = np.load(self.memory_file)
+            if isinstance(stored, np.lib.npyio.NpzFile):
+                with stored:
+                    self._load_sparse(stored)
+            else:
+                self.memory_space = self._convert_spectrum(self._decode_stored(stored))
         else:
             logging.info(f"Initializing new holographic memory with {dimensions} dimensions.")
-            self.memory_space = np.zeros(dimensions, dtype=complex)
+            self.memory_space = np.zeros(self.spectrum_size, dtype=complex)
+
+        if persistence == "log":
+            self._open_delta_log()
+
+    def _open_delta_log(self):
+        """
+        Open the delta log and replay the encodes logged since the last snapshot.
+        """
+        os.makedirs(os.path.dirname(self.memory_file) or ".", exist_ok=True)
+        self._delta_log = DeltaLog(self.memory_file + ".log", file_digest(self.memory_file))
+        for _, weight, key, value in self._delta_log.records():
+            binding = self._forward(self.normalize(key)) * self._forward(self.normalize(value))
+            self._superpose(binding * weight)
+        if self._delta_log.count:
+            logging.info(f"Replayed {self._delta_log.count} logged encodes onto {self.memory_file}.")
+
+    def _open_mmap(self):
+        """
+        Map the trace file into memory, creating or converting it to this memory's layout first.
+        """
+        os.makedirs(os.path.dirname(self.memory_file) or ".", exist_ok=True)
+        self._lock_file = open(self.memory_file + ".lock", "a+")
+        with self._locked():
+            stored = np.load(self.memory_file, mmap_mode="r") if os.path.exists(self.memory_file) else None
+            if isinstance(stored, np.lib.npyio.NpzFile):
+                with stored:
+                    stored = self._expand_sparse(stored)  # Compressed traces are mapped densely
+            if stored is None or stored.dtype != self._stored_dtype() or stored.shape != self._stored_shape():
+                if stored is None:
+                    logging.info(f"Initializing new memory-mapped holographic memory at {self.memory_file}.")
+                    space = np.zeros(self.spectrum_size, dtype=complex)
+                else:
+                    logging.info(f"Converting {self.memory_file} to the memory-mapped layout.")
+                    space = self._convert_spectrum(self._decode_stored(np.asarray(stored)))
+                del stored  # Release the read-only mapping before rewriting the file
+                self._space = None
+                layout = self._quantize(space) if self.dtype == "int8" else np.asarray(space, dtype=self.dtype)
+                np.save(self.memory_file, layout)
+            self._space = np.load(self.memory_file, mmap_mode="r+")
+        logging.info(f"Memory-mapped holographic memory from {self.memory_file}.")
+
+    def _stored_dtype(self):
+        """dtype of the trace as it is laid out on disk."""
+        if self.dtype == "int8":
+            return np.dtype([("scale", "<f4"), ("values", "i1", (2 * self.quantization_block,))])
+        return np.dtype(self.dtype)
+
+    def _stored_shape(self):
+        """Shape of the trace as it is laid out on disk."""
+        if self.dtype == "int8":
+            return (-(-self.spectrum_size // self.quantization_block),)
+        return (self.spectrum_size,)
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        """
+        Serialize access to the trace across threads and, for memory-mapped traces, across processes.
+        :param exclusive: Take an exclusive (write) lock instead of a shared (read) lock.
+        """
+        with self._thread_lock:
+            acquired = self._lock_file is not None and fcntl is not None and self._lock_depth == 0
+            if acquired:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if acquired:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _superpose(self, spectrum):
+        """Add a spectrum to the trace under the write lock."""
+        with self._locked():
+            self.memory_space += spectrum
+
+    @property
+    def memory_space(self):
+        """The trace as a dense complex spectrum (dequantized for the "int8" tier, expanded if sparse)."""
+        if self._sparse is not None:
+            indices, values = self._sparse
+            space = np.zeros(self.spectrum_size, dtype=values.dtype)
+            space[indices] = values
+            return space
+        if self.dtype == "int8":
+            return self._dequantize(self._space)
+        return self._space
+
+    @memory_space.setter
+    def memory_space(self, space):
+        if space is self._space:
+            return  # Updated in place
+        self._sparse = None  # Any dense write ends the sparse representation
+        if self.dtype == "int8":
+            # Error feedback: re-add what earlier writes lost to rounding, keep block scales from shrinking,
+            # and remember this write's rounding error, so the errors stay bounded instead of compounding
+            target = space if self._residual is None else space + self._dequantize(self._residual)
+            layout = self._quantize(target, min_scales=None if self._space is None else self._space["scale"])
+            error = target - self._dequantize(layout)
+            self._residual = self._quantize(error) if np.any(error) else None
+        else:
+            layout = np.asarray(space, dtype=self.dtype)
+        if isinstance(self._space, np.memmap):
+            self._space[...] = layout  # Write through the shared mapping
+        else:
+            self._space = layout
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the trace in its current precision tier (and sparse form, if compressed),
+        including the quantized rounding residual an "int8" trace carries between writes.
+        """
+        if self._sparse is not None:
+            return sum(part.nbytes for part in self._sparse)
+        residual_bytes = 0 if self._residual is None else self._residual.nbytes
+        return self._space.nbytes + residual_bytes
+
+    def _sparse_dtype(self):
+        """Complex dtype used for the values of a sparse trace."""
+        return np.complex128 if self.dtype == "complex128" else np.complex64
+
+    def _load_sparse(self, stored):
+        """
+        Restore a sparse trace saved by compress_memory(), densifying it if the layout differs.
+        :param stored: NpzFile with "indices", "values" and "spectrum_size".
+        """
+        indices, values = stored["indices"], stored["values"]
+        if int(stored["spectrum_size"]) == self.spectrum_size:
+            self._sparse = (indices.astype(np.int32), values.astype(self._sparse_dtype()))
+        else:
+            self.memory_space = self._convert_spectrum(self._expand_sparse(stored))
+
+    @staticmethod
+    def _expand_sparse(stored):
+        """Dense spectrum (in the layout it was saved in) of a sparse trace file."""
+        space = np.zeros(int(stored["spectrum_size"]), dtype=stored["values"].dtype)
+        space[stored["indices"]] = stored["values"]
+        return space
+
+    def _quantize(self, space, min_scales=None):
+        """
+        Block-quantize a complex spectrum to int8 with one float32 scale per block.
+        :param space: Dense complex spectrum (1D array).
+        :param min_scales: Optional lower bound of each block's scale (keeps existing scales stable).
+        :return: Structured array with one (scale, values) record per block.
+        """
+        block = self.quantization_block
+        num_blocks = -(-space.size // block)
+        parts = np.zeros((num_blocks * block, 2), dtype=np.float32)
+        parts[:space.size, 0] = space.real
+        parts[:space.size, 1] = space.imag
+        parts = parts.reshape(num_blocks, 2 * block)
+        scales = np.abs(parts).max(axis=1) / 127
+        if min_scales is not None:
+            scales = np.maximum(scales, min_scales)
+        safe_scales = np.where(scales > 0, scales, 1)
+        quantized = np.empty(num_blocks, dtype=[("scale", "<f4"), ("values", "i1", (2 * block,))])
+        quantized["scale"] = scales
+        quantized["values"] = np.rint(parts / safe_scales[:, None])
+        return quantized
+
+    def _dequantize(self, quantized):
+        """
+        Expand a block-quantized trace back into a dense complex64 spectrum.
+        :param quantized: Structured array produced by _quantize.
+        :return: Dense complex spectrum (1D array).
+        """
+        parts = quantized["values"].astype(np.float32) * quantized["scale"][:, None]
+        parts = parts.reshape(-1, 2)[:self.spectrum_size]
+        return parts[:, 0] + 1j * parts[:, 1]
+
+    def _decode_stored(self, stored):
+        """
+        Turn a trace loaded from disk into a dense complex spectrum, whatever tier it was saved in.
+        :param stored: Array loaded with np.load.
+        :return: Dense complex spectrum (1D array).
+        """
+        if stored.dtype.names and "scale" in stored.dtype.names:
+            parts = stored["values"].astype(np.float32) * stored["scale"][:, None]
+            parts = parts.reshape(-1, 2)
+            # Drop the padding of the last block: keep the full or half spectrum length it covers
+            block = stored["values"].shape[1] // 2
+            for size in (self.dimensions, self.dimensions // 2 + 1):
+                if -(-size // block) == stored.size:
+                    parts = parts[:size]
+                    break
+            return parts[:, 0] + 1j * parts[:, 1]
+        return stored
+
+    def _convert_spectrum(self, stored):
+        """
+        Convert a stored trace to this memory's spectrum layout.
+        Full spectra are truncated to their non-redundant half; half spectra are
+        expanded using Hermitian symmetry.
+        :param stored: Trace loaded from disk (full or half spectrum).
+        :return: Trace in the layout given by self.spectrum.
+        """
+        half_size = self.dimensions // 2 + 1
+        if stored.shape == (self.spectrum_size,):
+            return stored
+        if self.spectrum == "real" and stored.shape == (self.dimensions,):
+            logging.info(f"Converting full-spectrum trace {self.memory_file} to real half-spectrum.")
+            return np.ascontiguousarray(stored[:half_size])
+        if self.spectrum == "full" and stored.shape == (half_size,):
+            logging.info(f"Expanding real half-spectrum trace {self.memory_file} to full spectrum.")
+            return self._expand_half(stored)
+        raise ValueError(f"Trace in {self.memory_file} has shape {stored.shape}, "
+                         f"which does not match {self.dimensions} dimensions.")
+
+    def _expand_half(self, half):
+        """Full spectrum of a real signal from its rfft half-spectrum (Hermitian symmetry)."""
+        half_size = self.dimensions // 2 + 1
+        full = np.empty(self.dimensions, dtype=half.dtype)
+        full[:half_size] = half
+        full[half_size:] = np.conj(half[1:self.dimensions - half_size + 1][::-1])
+        return full
+
+    def _forward(self, vectors):
+        """Transform real vectors (along the last axis) into the stored spectrum layout."""
+        if self.spectrum == "real":
+            return self.fft.rfft(vectors, n=self.dimensions)
+        return self.fft.fft(vectors, n=self.dimensions)
+
+    def _inverse(self, spectra):
+        """Transform spectra in the stored layout back into real vectors."""
+        if self.spectrum == "real":
+            return self.fft.irfft(spectra, n=self.dimensions)
+        return np.real(self.fft.ifft(spectra))
+
+    def _spectrum_norm(self, spectrum):
+        """Norm of the full spectrum, counting mirrored bins of a half-spectrum twice."""
+        if self.spectrum == "full":
+            return np.linalg.norm(spectrum)
+        power = np.abs(spectrum) ** 2
+        mirrored = power[1:self.dimensions - self.spectrum_size + 1].sum()
+        return np.sqrt(power.sum() + mirrored)
 
     def save_memory(self):
         """
         Save the memory space to disk for persistence.
+        The snapshot is written to a temporary file and renamed into place, so a crash never leaves
+        a truncated trace; in "log" mode this also compacts the delta log. Memory-mapped traces are
+        flushed from the page cache instead of rewritten.
         """
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
-        np.save(self.memory_file, self.memory_space)
+        if isinstance(self._space, np.memmap):
+            with self._locked():
+                self._space.flush()
+        else:
+            os.makedirs(os.path.dirname(self.memory_file) or ".", exist_ok=True)
+            tmp_file = self.memory_file + ".tmp"
+            with self._locked():
+                with open(tmp_file, "wb") as snapshot:
+                    if self._sparse is not None:
+                        np.savez(snapshot, indices=self._sparse[0], values=self._sparse[1],
+                                 spectrum_size=self.spectrum_size)
+                    else:
+                        np.save(snapshot, self._space)
+                    snapshot.flush()
+                    os.fsync(snapshot.fileno())
+                os.replace(tmp_file, self.memory_file)
+                if self._delta_log is not None:
+                    self._delta_log.reset(file_digest(self.memory_file))
+        self._dirty = False
+        self._pending_writes = 0
+        self._last_save = time.monotonic()
         logging.info(f"Holographic memory saved to {self.memory_file}.")
 
+    def flush(self):
+        """
+        Save the memory space to disk if it has unsaved changes.
+        """
+        if self._dirty:
+            self.save_memory()
+
+    def checkpoint(self):
+        """
+        Force a save of the memory space regardless of the autosave policy.
+        """
+        self.save_memory()
+
+    def close(self):
+        """
+        Save pending changes and release the memory map and lock file, if any.
+        """
+        self.flush()
+        if self._delta_log is not None:
+            self._delta_log.close()
+            self._delta_log = None
+        if self._lock_file is not None:
+            self._space = np.array(self._space)  # Detach from the mapping
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _mark_dirty(self, writes=1):
+        """
+        Record pending writes and save once the autosave policy says so.
+        :param writes: Number of writes applied since the last call.
+        """
+        self._dirty = True
+        self._pending_writes += writes
+        if self.autosave_every is not None and self._pending_writes >= self.autosave_every:
+            self.save_memory()
+        else:
+            self._save_if_due()
+
+    def _save_if_due(self):
+        """
+        Save pending writes once autosave_interval seconds passed since the last save.
+        """
+        if self._dirty and self.autosave_interval is not None and \
+                time.monotonic() - self._last_save >= self.autosave_interval:
+            self.save_memory()
+
     def normalize(self, vector):
         """Normalize a vector to unit length."""
         norm = np.linalg.norm(vector)
@@ -52,62 +469,321 @@ class HolographicMemory:
         """
         key = self.normalize(key)
         value = self.normalize(value)
-        key_fft = fft(key, n=self.dimensions)
-        value_fft = fft(value, n=self.dimensions)
-        self.memory_space += key_fft * value_fft * (1 + regularization)
+        key_fft = self._forward(key)
+        value_fft = self._forward(value)
+        self._superpose(key_fft * value_fft * (1 + regularization))
+        self._dirty = True  # Saved on the next flush
 
-    def retrieve(self, key):
+    def normalize_many(self, vectors):
+        """Normalize each row of a 2D array to unit length."""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def encode_many(self, keys, values, regularization):
+        """
+        Encode a batch of key-value pairs into holographic memory in one vectorized pass.
+        :param keys: Key vectors (2D array, one key per row).
+        :param values: Value vectors (2D array, one value per row).
+        :param regularization: Regularization factor (scalar or one value per row).
+        """
+        keys = self.normalize_many(np.atleast_2d(np.asarray(keys, dtype=float)))
+        values = self.normalize_many(np.atleast_2d(np.asarray(values, dtype=float)))
+        if keys.shape[0] != values.shape[0]:
+            raise ValueError(f"Got {keys.shape[0]} keys but {values.shape[0]} values.")
+        key_fft = self._forward(keys)
+        value_fft = self._forward(values)
+        weights = 1 + np.broadcast_to(np.asarray(regularization, dtype=float), (keys.shape[0],))
+        self._superpose(np.einsum("i,ij->j", weights, key_fft * value_fft))
+        self._dirty = True  # Saved on the next flush
+
+    def _apply_unbinding(self, spectrum, key_fft, retrieval):
+        """
+        Unbind key spectra from trace bins with the selected operator.
+        """
+        if retrieval == "correlation":
+            return spectrum * np.conj(key_fft)
+        if retrieval == "wiener":
+            power = key_fft.real ** 2 + key_fft.imag ** 2
+            return spectrum * np.conj(key_fft) / (power + self.wiener_noise)
+        return spectrum / (key_fft + 1e-9)  # Avoid division by zero
+
+    def _unbind(self, key_fft, retrieval=None):
+        """
+        Unbind key spectra (1D or 2D) from the trace, touching only the stored bins of a sparse trace.
+        :param retrieval: One of RETRIEVAL_MODES (defaults to self.retrieval).
+        """
+        retrieval = retrieval or self.retrieval
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval}'. Use one of {RETRIEVAL_MODES}.")
+        with self._locked(exclusive=False):
+            if self._sparse is None:
+                return self._apply_unbinding(self.memory_space, key_fft, retrieval)
+            indices, values = self._sparse
+            retrieved_fft = np.zeros(key_fft.shape, dtype=complex)
+            retrieved_fft[..., indices] = self._apply_unbinding(values, key_fft[..., indices], retrieval)
+            return retrieved_fft
+
+    def retrieve(self, key, denoise=None, retrieval=None):
         """
         Retrieve the value associated with a given key.
         :param key: Input key vector (1D array).
+        :param denoise: Denoising mode for this call (defaults to self.denoise).
+        :param retrieval: Unbinding operator for this call (defaults to self.retrieval).
         :return: Retrieved value vector (1D array).
         """
+        self._save_if_due()  # Reads also check the interval, so writes followed by only reads are saved
         key = self.normalize(key)
-        key_fft = fft(key, n=self.dimensions)
-        retrieved_fft = self.memory_space / (key_fft + 1e-9)  # Avoid division by zero
-        retrieved_value = np.real(ifft(retrieved_fft))
-        return self.noise_reduction(retrieved_value)
+        key_fft = self._forward(key)
+        retrieved_fft = self._unbind(key_fft, retrieval)
+        return self._reconstruct(retrieved_fft, denoise)
+
+    def retrieve_many(self, keys, denoise=None, retrieval=None):
+        """
+        Retrieve the values associated with a batch of keys in one vectorized pass.
+        :param keys: Input key vectors (2D array, one key per row).
+        :param denoise: Denoising mode for this call (defaults to self.denoise).
+        :param retrieval: Unbinding operator for this call (defaults to self.retrieval).
+        :return: Retrieved value vectors (2D array, one value per row).
+        """
+        self._save_if_due()
+        keys = self.normalize_many(np.atleast_2d(np.asarray(keys, dtype=float)))
+        key_fft = self._forward(keys)
+        retrieved_fft = self._unbind(key_fft, retrieval)
+        return self._reconstruct(retrieved_fft, denoise)
+
+    def _reconstruct(self, retrieved_fft, denoise=None, gaussian_sigma=2, median_width=3):
+        """
+        Turn retrieved spectra into value vectors using the selected denoising pipeline.
+        :param retrieved_fft: Retrieved spectra (1D or 2D, in the stored layout).
+        :param denoise: One of DENOISE_MODES (defaults to self.denoise).
+        :return: Retrieved value vector(s).
+        """
+        denoise = denoise or self.denoise
+        if denoise not in DENOISE_MODES:
+            raise ValueError(f"Unknown denoise mode '{denoise}'. Use one of {DENOISE_MODES}.")
+        if denoise == "gaussian+median":
+            return self.noise_reduction(self._inverse(retrieved_fft), gaussian_sigma, median_width)
+        if denoise == "none":
+            return self._inverse(retrieved_fft)
+        values = self._inverse(retrieved_fft * self._gaussian_window(gaussian_sigma))
+        if denoise == "spectral":
+            values = running_median(values, median_width)
+        return values
+
+    def _gaussian_window(self, sigma):
+        """
+        Frequency response of a Gaussian filter with the given sigma, in the stored spectrum layout.
+        Multiplying a spectrum by it equals circular Gaussian smoothing of the vector.
+        """
+        window = self._gaussian_windows.get(sigma)
+        if window is None:
+            if self.spectrum == "real":
+                frequencies = np.fft.rfftfreq(self.dimensions)
+            else:
+                frequencies = np.fft.fftfreq(self.dimensions)
+            window = np.exp(-2 * (np.pi * sigma * frequencies) ** 2)
+            self._gaussian_windows[sigma] = window
+        return window
 
     def noise_reduction(self, value, gaussian_sigma=2, median_width=3):
         """
         Apply noise reduction to the retrieved value using Gaussian and median filters.
-        :param value: Input vector (1D array).
+        Batches (2D arrays) are filtered row by row along the last axis.
+        :param value: Input vector (1D array) or batch of vectors (2D array).
         :param gaussian_sigma: Sigma for Gaussian filter.
         :param median_width: Kernel size for median filter.
-        :return: Denoised value vector.
+        :return: Denoised value vector(s).
         """
-        value = gaussian_filter1d(value, sigma=gaussian_sigma)
-        value = medfilt(value, kernel_size=median_width)
+        value = gaussian_filter1d(value, sigma=gaussian_sigma, axis=-1)
+        kernel_size = [1] * (value.ndim - 1) + [median_width]
+        value = medfilt(value, kernel_size=kernel_size)
         return value
 
-    def dynamic_encode(self, key, value, max_iterations=10, tolerance=1e-4):
+    def adaptive_weight(self, binding_norm, max_iterations=10, tolerance=1e-4):
+        """
+        Compute the total weight the adaptive-regularization loop would apply to a binding.
+        Iteration i adds the binding scaled by (1 + r_i) and stops once that update's norm
+        drops below the tolerance, so the sum of the applied factors has a closed form.
+        :param binding_norm: Norm of the key/value binding spectrum (scalar or array).
+        :param max_iterations: Maximum number of encoding iterations.
+        :param tolerance: Tolerance for convergence.
+        :return: Tuple of (total weight, iterations used), shaped like binding_norm.
+        """
+        factors = 1 + self.initial_regularization * np.exp(-np.arange(max_iterations) / 10)
+        binding_norm = np.asarray(binding_norm, dtype=float)
+        converged = binding_norm[..., None] * factors < tolerance
+        iterations = np.where(converged.any(axis=-1), converged.argmax(axis=-1) + 1, max_iterations)
+        cumulative = np.cumsum(factors)
+        return cumulative[iterations - 1], iterations
+
+    def dynamic_encode(self, key, value, max_iterations=10, tolerance=1e-4, iterative=False):
         """
         Dynamically encode a key-value pair using adaptive regularization.
         :param key: Key vector (1D array).
         :param value: Value vector (1D array).
         :param max_iterations: Maximum number of encoding iterations.
         :param tolerance: Tolerance for convergence.
+        :param iterative: Run the original iteration loop instead of the closed-form update.
+        """
+        if iterative:
+            with self._locked():
+                for i in range(max_iterations):
+                    regularization = self.initial_regularization * np.exp(-i / 10)  # Adaptive regularization
+                    previous_memory = self.memory_space.copy()
+                    self.encode(key, value, regularization)
+                    if self._spectrum_norm(self.memory_space - previous_memory) < tolerance:
+                        logging.info(f"[HolographicMemory] Converged after {i + 1} iterations.")
+                        break
+        else:
+            key_fft = self._forward(self.normalize(key))
+            value_fft = self._forward(self.normalize(value))
+            binding = key_fft * value_fft
+            weight, iterations = self.adaptive_weight(self._spectrum_norm(binding), max_iterations, tolerance)
+            if iterations < max_iterations:
+                logging.info(f"[HolographicMemory] Converged after {iterations} iterations.")
+            with self._locked():
+                self._superpose(binding * weight)
+                if self._delta_log is not None:
+                    self._delta_log.append(key, value, weight)
+            if self._delta_log is not None:
+                if self._delta_log.count >= self.compact_every:
+                    self.save_memory()  # Fold the log into a fresh snapshot
+                return
+        self._mark_dirty()  # Save according to the autosave policy
+
+    def weighted_bindings(self, keys, values, max_iterations=10, tolerance=1e-4, chunk_size=256):
+        """
+        Sum of the bindings dynamic_encode would superpose for a batch of pairs, without touching the trace.
+        :param keys: Key vectors (2D array, one key per row).
+        :param values: Value vectors (2D array, one value per row).
+        :param max_iterations: Maximum number of encoding iterations.
+        :param tolerance: Tolerance for convergence.
+        :param chunk_size: Pairs transformed at once (bounds the temporary spectra).
+        :return: Tuple of (summed weighted binding spectrum in the stored layout, weight per pair).
         """
-        for i in range(max_iterations):
-            regularization = self.initial_regularization * np.exp(-i / 10)  # Adaptive regularization
-            previous_memory = self.memory_space.copy()
-            self.encode(key, value, regularization)
-            if np.linalg.norm(self.memory_space - previous_memory) < tolerance:
-                logging.info(f"[HolographicMemory] Converged after {i + 1} iterations.")
-                break
-        self.save_memory()  # Save memory after encoding
+        keys = np.atleast_2d(np.asarray(keys, dtype=float))
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        if keys.shape[0] != values.shape[0]:
+            raise ValueError(f"Got {keys.shape[0]} keys but {values.shape[0]} values.")
+        length = keys.shape[1] + values.shape[1] - 1
+        if length < self.dimensions:
+            return self._weighted_short_bindings(keys, values, length, max_iterations, tolerance, chunk_size)
+        # Keys and values are real, so bind in the rfft half-spectrum (half the FFT work) and
+        # expand the sum to the full layout once at the end
+        half_size = self.dimensions // 2 + 1
+        mirrored = slice(1, self.dimensions - half_size + 1)  # Bins that appear twice in the full spectrum
+        total = np.zeros(half_size, dtype=complex)
+        weights = np.empty(keys.shape[0])
+        for begin in range(0, keys.shape[0], chunk_size):
+            rows = slice(begin, begin + chunk_size)
+            bindings = (self.fft.rfft(self.normalize_many(keys[rows]), n=self.dimensions)
+                        * self.fft.rfft(self.normalize_many(values[rows]), n=self.dimensions))
+            power = bindings.real ** 2 + bindings.imag ** 2
+            norms = np.sqrt(power.sum(axis=1) + power[:, mirrored].sum(axis=1))
+            weights[rows], _ = self.adaptive_weight(norms, max_iterations, tolerance)
+            total += weights[rows] @ bindings
+        return (total if self.spectrum == "real" else self._expand_half(total)), weights
+
+    def _weighted_short_bindings(self, keys, values, length, max_iterations, tolerance, chunk_size):
+        """
+        weighted_bindings for vectors much shorter than the trace: their zero-padded circular
+        convolution is a linear convolution of `length` samples, so it can be computed with small
+        FFTs, summed in the signal domain and transformed to the trace size once.
+        """
+        size = next_fast_len(length, real=True)
+        total = np.zeros(length)
+        weights = np.empty(keys.shape[0])
+        for begin in range(0, keys.shape[0], chunk_size):
+            rows = slice(begin, begin + chunk_size)
+            spectra = (self.fft.rfft(self.normalize_many(keys[rows]), n=size)
+                       * self.fft.rfft(self.normalize_many(values[rows]), n=size))
+            convolutions = self.fft.irfft(spectra, n=size)[:, :length]
+            # Parseval: the binding spectrum at the trace size has norm sqrt(dimensions) * |convolution|
+            norms = np.sqrt(self.dimensions) * np.linalg.norm(convolutions, axis=1)
+            weights[rows], _ = self.adaptive_weight(norms, max_iterations, tolerance)
+            total += weights[rows] @ convolutions
+        return self._forward(total), weights
+
+    def dynamic_encode_many(self, keys, values, max_iterations=10, tolerance=1e-4):
+        """
+        Dynamically encode a batch of key-value pairs in one pass; the trace ends up as if
+        dynamic_encode had been called for every pair, but is superposed (and logged) once.
+        :param keys: Key vectors (2D array, one key per row).
+        :param values: Value vectors (2D array, one value per row).
+        :param max_iterations: Maximum number of encoding iterations.
+        :param tolerance: Tolerance for convergence.
+        """
+        keys = np.atleast_2d(np.asarray(keys, dtype=float))
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        spectrum, weights = self.weighted_bindings(keys, values, max_iterations, tolerance)
+        with self._locked():
+            self._superpose(spectrum)
+            if self._delta_log is not None:
+                for key, value, weight in zip(keys, values, weights):
+                    self._delta_log.append(key, value, weight)
+        if self._delta_log is not None:
+            if self._delta_log.count >= self.compact_every:
+                self.save_memory()  # Fold the log into a fresh snapshot
+            return
+        self._mark_dirty(len(keys))  # Save according to the autosave policy
+
+    def forget_many(self, keys, values, max_iterations=10, tolerance=1e-4):
+        """
+        Subtract previously encoded key-value pairs from the trace. The weight dynamic_encode gives a
+        pair depends only on the pair, so this exactly undoes dynamic_encode / dynamic_encode_many
+        called with the same arguments (up to the precision of the stored vectors).
+        :param keys: Key vectors (2D array, one key per row).
+        :param values: Value vectors (2D array, one value per row).
+        :param max_iterations: Maximum number of encoding iterations the pairs were encoded with.
+        :param tolerance: Tolerance for convergence the pairs were encoded with.
+        """
+        keys = np.atleast_2d(np.asarray(keys, dtype=float))
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        spectrum, weights = self.weighted_bindings(keys, values, max_iterations, tolerance)
+        with self._locked():
+            self._superpose(-spectrum)
+            if self._delta_log is not None:
+                for key, value, weight in zip(keys, values, weights):
+                    self._delta_log.append(key, value, -weight)
+        if self._delta_log is not None:
+            if self._delta_log.count >= self.compact_every:
+                self.save_memory()  # Fold the log into a fresh snapshot
+            return
+        self._mark_dirty(len(keys))  # Save according to the autosave policy
 
     def compress_memory(self, threshold=None):
         """
         Compress the memory by removing low-magnitude elements.
-        :param threshold: Threshold for compression. If None, use adaptive thresholding.
-        :return: Compression ratio (percentage of memory retained).
-        """
-        if threshold is None:
-            threshold = np.percentile(np.abs(self.memory_space), 75)  # Retain 25% of memory
-        mask = np.abs(self.memory_space) > threshold
-        retained_elements = np.sum(mask)
-        compression_ratio = retained_elements / self.dimensions
-        self.memory_space[~mask] = 0
-        self.save_memory()  # Save memory after compression
+        The retained elements are kept (in memory and on disk) as sparse indices plus values;
+        memory-mapped traces are zeroed in place instead, since the shared file stays dense.
+        :param threshold: Threshold for compression. If None, keep the largest 25% of elements.
+        :return: Compression ratio (fraction of the dense trace's bytes still used).
+        """
+        with self._locked():
+            dense_bytes = self._stored_dtype().itemsize * self._stored_shape()[0]
+            space = self.memory_space
+            magnitudes = np.abs(space)
+            if threshold is None:
+                retained = -(-space.size // 4)  # Retain 25% of memory
+                indices = np.argpartition(magnitudes, space.size - retained)[space.size - retained:]
+                indices = indices[magnitudes[indices] > 0]
+            else:
+                indices = np.flatnonzero(magnitudes > threshold)
+            indices = np.sort(indices).astype(np.int32)
+
+            values = space[indices].astype(self._sparse_dtype())
+            if isinstance(self._space, np.memmap) or indices.nbytes + values.nbytes >= dense_bytes:
+                # Shared maps (and tiers already smaller than indices plus values) stay dense
+                mask = np.zeros(space.size, dtype=bool)
+                mask[indices] = True
+                space[~mask] = 0
+                self.memory_space = space
+                compression_ratio = 1.0
+            else:
+                self._sparse = (indices, values)
+                self._space = None
+                self._residual = None
+                compression_ratio = self.nbytes / dense_bytes
+        self._mark_dirty()  # Save according to the autosave policy
         return compression_ratio
\ No newline at end of file
@@ -0,0 +1,155 @@
+# core/item_memory.py
+
+import os
+import logging
+import threading
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ItemMemory:
+    def __init__(self, dimensions=1024, memory_file=None, initial_capacity=64):
+        """
+        Cleanup memory: the stored value vectors of a trace, kept as one contiguous matrix
+        so a noisy retrieved vector can be matched back to the original output.
+        :param dimensions: Length of the stored value vectors.
+        :param memory_file: Optional .npz path to save/load the items.
+        :param initial_capacity: Number of rows allocated up front (grows by doubling).
+        """
+        self.dimensions = dimensions
+        self.memory_file = memory_file
+        self.count = 0
+        self._vectors = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._row_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._outputs = []
+        self.generation = None  # Optional id of the data the items belong to, saved with them
+        self._dirty = False
+        # Writers and matchers share one store across threads (callers, write-behind, retention)
+        self._lock = threading.RLock()
+
+        if memory_file and os.path.exists(memory_file):
+            logging.info(f"Loading item memory from {memory_file}...")
+            with np.load(memory_file) as stored:
+                self.add_many(stored["vectors"], stored["row_ids"], stored["outputs"].tolist())
+                if "generation" in stored.files:
+                    self.generation = str(stored["generation"])
+            self._dirty = False
+
+    @property
+    def row_ids(self):
+        """Database row ids of the stored items, in insertion order."""
+        with self._lock:
+            return self._row_ids[:self.count].copy()
+
+    def _reserve(self, extra):
+        """Grow the matrix so that `extra` more rows fit."""
+        needed = self.count + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[:self.count] = self._vectors[:self.count]
+        row_ids = np.zeros(capacity, dtype=np.int64)
+        row_ids[:self.count] = self._row_ids[:self.count]
+        self._vectors, self._row_ids = vectors, row_ids
+
+    def _fit(self, vectors):
+        """Truncate or zero-pad vectors (along the last axis) to the item dimensions."""
+        vectors = np.asarray(vectors, dtype=np.float32)[..., :self.dimensions]
+        if vectors.shape[-1] < self.dimensions:
+            padding = [(0, 0)] * (vectors.ndim - 1) + [(0, self.dimensions - vectors.shape[-1])]
+            vectors = np.pad(vectors, padding)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def add(self, vector, row_id, output):
+        """
+        Store one value vector with its database row id and output text.
+        """
+        self.add_many([vector], [row_id], [output])
+
+    def add_many(self, vectors, row_ids, outputs):
+        """
+        Store a batch of value vectors with their database row ids and output texts.
+        """
+        vectors = self._fit(np.atleast_2d(vectors))
+        with self._lock:
+            self._reserve(len(vectors))
+            self._vectors[self.count:self.count + len(vectors)] = vectors
+            self._row_ids[self.count:self.count + len(vectors)] = row_ids
+            self._outputs.extend(str(output) for output in outputs)
+            self.count += len(vectors)
+            self._dirty = True
+
+    def remove_many(self, row_ids):
+        """
+        Drop the items stored under the given database row ids.
+        :return: Number of items removed.
+        """
+        with self._lock:
+            keep = ~np.isin(self._row_ids[:self.count], row_ids)
+            removed = self.count - int(keep.sum())
+            if removed:
+                kept = np.flatnonzero(keep)
+                self._vectors[:len(kept)] = self._vectors[kept]
+                self._row_ids[:len(kept)] = self._row_ids[kept]
+                self._outputs = [self._outputs[i] for i in kept.tolist()]
+                self.count = len(kept)
+                self._dirty = True
+            return removed
+
+    def match(self, vector, k=1):
+        """
+        Find the stored items most similar (by cosine) to a retrieved vector.
+        :param vector: Retrieved value vector (1D array).
+        :param k: Number of matches to return.
+        :return: List of dictionaries with "id", "output" and "confidence", best first.
+        """
+        return self.match_many(np.atleast_2d(vector), k)[0]
+
+    def match_many(self, vectors, k=1):
+        """
+        Vectorized top-k cosine match for a batch of retrieved vectors.
+        :param vectors: Retrieved value vectors (2D array, one per row).
+        :param k: Number of matches per vector.
+        :return: One list of matches (see match) per input row.
+        """
+        vectors = self._fit(vectors)
+        with self._lock:
+            if self.count == 0:
+                return [[] for _ in range(len(vectors))]
+            scores = vectors @ self._vectors[:self.count].T
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            return [[{"id": int(self._row_ids[i]), "output": self._outputs[i], "confidence": float(scores[row, i])}
+                     for i in top[row]]
+                    for row in range(len(vectors))]
+
+    def save(self):
+        """
+        Save the items to memory_file (if set).
+        """
+        if not self.memory_file:
+            return
+        os.makedirs(os.path.dirname(self.memory_file) or ".", exist_ok=True)
+        tmp_file = self.memory_file + ".tmp"
+        with self._lock:
+            extra = {} if self.generation is None else {"generation": np.array(self.generation)}
+            with open(tmp_file, "wb") as items:
+                np.savez(items, vectors=self._vectors[:self.count], row_ids=self._row_ids[:self.count],
+                         outputs=np.array(self._outputs, dtype=str), **extra)
+            os.replace(tmp_file, self.memory_file)
+            self._dirty = False
+
+    def flush(self):
+        """
+        Save the items if they changed since the last save.
+        """
+        if self._dirty:
+            self.save()
@@ -0,0 +1,108 @@
+# core/memory_registry.py
+
+import os
+import atexit
+import logging
+import threading
+from core.holographic_memory import HolographicMemory
+from core.binary_memory import BinaryHolographicMemory
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Associative memory implementations and the trace file each uses by default
+MEMORY_BACKENDS = {"holographic": HolographicMemory, "binary": BinaryHolographicMemory}
+DEFAULT_MEMORY_FILES = {"holographic": "data/holographic_memory.npy", "binary": "data/binary_memory.npz"}
+
+class HolographicMemoryRegistry:
+    def __init__(self):
+        """
+        Hand out one shared memory per (memory_file, dimensions, backend, dtype).
+        """
+        self._entries = {}  # key -> [memory, reference count]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(memory_file, dimensions, backend, dtype):
+        return os.path.abspath(memory_file), dimensions, backend, dtype
+
+    def acquire(self, memory_file=None, dimensions=16384, dtype="complex128", backend="holographic", **options):
+        """
+        Return the shared memory for a trace file, creating it on first use.
+        Shared memories save only when flushed (or at shutdown) unless autosave options are given.
+        :param memory_file: File path of the trace (defaults to the backend's entry in DEFAULT_MEMORY_FILES).
+        :param dimensions: Number of dimensions for memory representation.
+        :param dtype: Precision tier of the stored spectrum ("holographic" backend only).
+        :param backend: "holographic" (complex FFT traces) or "binary" (bit-packed hypervectors).
+        :param options: Extra arguments for the backend class, used only when the memory is created.
+        :return: Shared memory instance.
+        """
+        if backend not in MEMORY_BACKENDS:
+            raise ValueError(f"Unknown memory backend '{backend}'. Use one of {tuple(MEMORY_BACKENDS)}.")
+        memory_file = memory_file or DEFAULT_MEMORY_FILES[backend]
+        if backend == "holographic":
+            options["dtype"] = dtype
+        else:
+            dtype = MEMORY_BACKENDS[backend].dtype  # Backends other than holographic have one storage format
+        key = self._key(memory_file, dimensions, backend, dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                options.setdefault("autosave_every", None)
+                memory = MEMORY_BACKENDS[backend](dimensions=dimensions, memory_file=memory_file, **options)
+                entry = self._entries[key] = [memory, 0]
+            elif options:
+                logging.debug(f"[MemoryRegistry] Reusing {memory_file}; ignoring options {sorted(options)}.")
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, memory):
+        """
+        Drop one reference to a shared memory; the last release flushes and closes it.
+        :param memory: Memory returned by acquire().
+        """
+        key = self._key(memory.memory_file, memory.dimensions, memory.backend, memory.dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not memory:
+                memory.close()  # Not shared through the registry
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._entries[key]
+        memory.close()
+
+    def flush_all(self):
+        """
+        Save every shared memory that has unsaved changes.
+        """
+        with self._lock:
+            memories = [entry[0] for entry in self._entries.values()]
+        for memory in memories:
+            memory.flush()
+
+    def close_all(self):
+        """
+        Flush and close every shared memory, regardless of outstanding references.
+        """
+        with self._lock:
+            memories = [entry[0] for entry in self._entries.values()]
+            self._entries.clear()
+        for memory in memories:
+            memory.close()
+
+
+# Process-wide registry, flushed once at interpreter shutdown
+registry = HolographicMemoryRegistry()
+atexit.register(registry.close_all)
+
+
+def acquire_memory(memory_file=None, dimensions=16384, dtype="complex128", backend="holographic", **options):
+    """Return the process-wide shared memory for a trace file (see HolographicMemoryRegistry.acquire)."""
+    return registry.acquire(memory_file=memory_file, dimensions=dimensions, dtype=dtype, backend=backend, **options)
+
+
+def release_memory(memory):
+    """Release a memory obtained from acquire_memory()."""
+    registry.release(memory)
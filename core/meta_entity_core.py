@@ -7,23 +7,24 @@ import os
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(root_dir)
 
-from memory_store import MemoryStore
+from memory_store import acquire_store
 from core.meta_learning import MetaLearning
 from core.entity_core import SuperEntity
-from core.holographic_memory import HolographicMemory
+from core.memory_registry import acquire_memory
 
 class MetaEntity:
-    def __init__(self, name):
+    def __init__(self, name, write_behind=False):
         """
         Initialize a MetaEntity.
         :param name: Name of the MetaEntity.
+        :param write_behind: Persist integrated task results from a background writer thread.
         """
         self.name = name
-        self.memory = MemoryStore(db_path="data/meta_memory.db")
+        self.memory = acquire_store("data/meta_memory.db", write_behind=write_behind)
         self.meta_learning = MetaLearning()
         self.entities = []  # List of SuperEntities managed by the meta-entity
         self.normal_entities = []  # List of NormalEntities managed by the meta-entity
-        self.holographic_memory = HolographicMemory(memory_file=f"data/{name}_holographic_memory.npy")
+        self.holographic_memory = acquire_memory(memory_file=f"data/{name}_holographic_memory.npy")
 
     def register_entity(self, entity):
         """
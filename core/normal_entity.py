@@ -1,28 +1,46 @@
 # normal_entity.py
 
-import numpy as np
-from core.holographic_memory import HolographicMemory
+from core.memory_registry import acquire_memory
+from core.item_memory import ItemMemory
+from utils.text_encoder import encode_text, canonical_text
 from core.learning_engine import LearningEngine
 import logging
+import weakref
+import hashlib
 import json  # Add this import
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def _flush_memories(holographic_memory, item_memory):
+    """Save the shared trace before the item memory, so saved pairs are never missing from the saved trace."""
+    holographic_memory.flush()
+    item_memory.flush()
+
+
 class NormalEntity:
-    def __init__(self, name, domain, learning_engine=None, memory_store=None):
+    def __init__(self, name, domain, learning_engine=None, memory_store=None, min_confidence=0.15,
+                 memory_backend="holographic"):
         """
         Initialize a NormalEntity.
         :param name: Name of the entity.
         :param domain: Domain the entity specializes in (e.g., "math", "english").
         :param learning_engine: Optional LearningEngine for dynamic learning.
         :param memory_store: Optional MemoryStore for persistent knowledge storage.
+        :param min_confidence: Cleanup-memory score needed to answer a task from memory.
+        :param memory_backend: "holographic" (complex FFT traces) or "binary" (bit-packed hypervectors).
         """
         self.name = name
         self.domain = domain
         self.learning_engine = learning_engine
         self.memory_store = memory_store
-        self.holographic_memory = HolographicMemory(dimensions=16384)  # Local holographic memory
+        self.holographic_memory = acquire_memory(dimensions=16384, backend=memory_backend)  # Shared memory
+        self.item_memory = ItemMemory(memory_file=f"data/{name}_items.npz")  # Stored outputs for cleanup
+        self.min_confidence = min_confidence
+        # The trace is saved before the cleanup memory, which records the pairs it holds
+        weakref.finalize(self, _flush_memories, self.holographic_memory, self.item_memory)
+        # Pairs already in the trace (item memory row ids are pair ids, so this survives restarts)
+        self._stored_pairs = set(self.item_memory.row_ids.tolist())
 
     def store_knowledge(self, input_data, output_data):
         """
@@ -30,18 +48,28 @@ class NormalEntity:
         :param input_data: Input data (e.g., task or query).
         :param output_data: Output data (e.g., result or response).
         """
-        # Convert input and output to numerical vectors
-        input_vector = self._text_to_vector(input_data)
-        output_vector = self._text_to_vector(output_data)
-
-        # Store in holographic memory
-        self.holographic_memory.dynamic_encode(input_vector, output_vector)
+        # Store in holographic memory, unless this exact pair is already there
+        pair_id = self._pair_id(input_data, output_data)
+        if pair_id not in self._stored_pairs:
+            # Convert input and output to numerical vectors
+            input_vector = self._text_to_vector(input_data)
+            output_vector = self._text_to_vector(output_data)
+            self.holographic_memory.dynamic_encode(input_vector, output_vector)
+            self.item_memory.add(output_vector, pair_id, json.dumps(output_data, default=str))
+            self._stored_pairs.add(pair_id)
 
         # Store in the database (if memory_store is provided)
         if self.memory_store:
             self.memory_store.store_knowledge(str(input_data), str(output_data), self.domain)
         logging.info(f"[{self.name}] Stored knowledge: {input_data} -> {output_data}")
 
+    @staticmethod
+    def _pair_id(input_data, output_data):
+        """Stable 63-bit id of an input/output pair, used as its item memory row id."""
+        pair = json.dumps([canonical_text(input_data), json.dumps(output_data, default=str)])
+        digest = hashlib.blake2b(pair.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") >> 1
+
     def process_task(self, task_input):
         """
         Process a task in the entity's domain.
@@ -89,10 +117,16 @@ class NormalEntity:
         # Convert input to a numerical vector
         input_vector = self._text_to_vector(input_data)
         
-        # Retrieve the result vector from holographic memory
-        result_vector = self.holographic_memory.retrieve(input_vector)
-        
-        # Decode the result vector based on the domain
+        # Retrieve the result vector from holographic memory (undenoised, by correlation: only the
+        # cleanup match uses it, and correlation tolerates far more stored pairs than the inverse)
+        result_vector = self.holographic_memory.retrieve(input_vector, denoise="none", retrieval="correlation")
+
+        # Answer from memory when the cleanup memory recognizes the retrieved vector
+        matches = self.item_memory.match(result_vector)
+        if matches and matches[0]["confidence"] >= self.min_confidence:
+            return json.loads(matches[0]["output"])
+
+        # Otherwise decode based on the domain
         if self.domain == "math":
             # For math tasks, deserialize the result if it's a JSON string
             if isinstance(input_data, dict):
@@ -177,13 +211,6 @@ class NormalEntity:
         Convert text into a high-dimensional vector.
         :param text: Input text (can be a string, dictionary, or other types).
         :param dimensions: Number of dimensions for the vector.
-        :return: A high-dimensional vector.
-        """
-        if isinstance(text, dict):
-            # Convert dictionary to a string representation
-            text = str(sorted(text.items()))  # Sort items to ensure consistent hashing
-        elif not isinstance(text, str):
-            # Convert other types to string
-            text = str(text)
-        np.random.seed(hash(text) % (2**32))  # Consistent hash for text
-        return np.random.randn(dimensions)
\ No newline at end of file
+        :return: A high-dimensional vector (the same vector in every process).
+        """
+        return encode_text(text, dimensions)
\ No newline at end of file
@@ -0,0 +1,279 @@
+# core/sharded_memory.py
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core.holographic_memory import HolographicMemory
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ShardedHolographicMemory:
+    def __init__(self, num_shards=4, dimensions=16384, memory_file="data/holographic_memory.npy",
+                 max_load=None, workers=None, **options):
+        """
+        Spread key-value pairs over several holographic traces, routed by a stable hash of the key.
+        A shard whose load (number of distinct keys) passes max_load is sealed and split in two:
+        keys it already holds stay there, new keys in its hash range go to the two children.
+        :param num_shards: Number of shards to start with.
+        :param dimensions: Number of dimensions of every shard.
+        :param memory_file: Base file path; shards live in "<base>_shard<N>.npy", routing in "<base>_shards.json".
+        :param max_load: Distinct keys per shard before it splits (defaults to dimensions // 256).
+        :param workers: Threads used to encode/retrieve shards in parallel (None lets the executor decide).
+        :param options: Extra HolographicMemory arguments applied to every shard. The autosave options
+                        (autosave_every, autosave_interval) apply to the sharded memory as a whole, so the
+                        shards and the routing metadata are always saved together.
+        """
+        self.dimensions = dimensions
+        self.memory_file = memory_file
+        self.max_load = max_load if max_load is not None else max(1, dimensions // 256)
+        self.autosave_every = options.pop("autosave_every", 1)
+        self.autosave_interval = options.pop("autosave_interval", None)
+        self._pending_writes = 0
+        self._last_save = time.monotonic()
+        self.options = options
+        self._root, self._ext = os.path.splitext(memory_file)
+        self._meta_file = f"{self._root}_shards.json"
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.shards = {}      # shard id -> HolographicMemory
+        self._loads = {}      # shard id -> distinct keys stored
+        self._leaves = {}     # (bucket, depth, bits) -> shard id receiving new keys
+        self._splits = set()  # (bucket, depth, bits) nodes that have been split
+        self._key_index = {}  # key hash -> shard id holding that key
+
+        if os.path.exists(self._meta_file):
+            self._load_metadata()
+        else:
+            self.num_shards = num_shards
+            for bucket in range(num_shards):
+                self._leaves[(bucket, 0, 0)] = self._new_shard()
+
+    def _shard_file(self, shard_id):
+        return f"{self._root}_shard{shard_id}{self._ext}"
+
+    def _new_shard(self, shard_id=None, load=0):
+        """Create (or reopen) a shard and return its id."""
+        if shard_id is None:
+            shard_id = len(self.shards)
+        # Shards never save on their own: routing for their new keys would lag behind their data
+        self.shards[shard_id] = HolographicMemory(dimensions=self.dimensions, memory_file=self._shard_file(shard_id),
+                                                  autosave_every=None, autosave_interval=None, **self.options)
+        self._loads[shard_id] = load
+        return shard_id
+
+    def _load_metadata(self):
+        """Restore routing state and reopen the shards listed in the metadata file."""
+        with open(self._meta_file) as meta:
+            state = json.load(meta)
+        self.num_shards = state["num_shards"]
+        for shard_id, load in state["loads"].items():
+            self._new_shard(int(shard_id), load)
+        self._leaves = {tuple(node): shard_id for *node, shard_id in state["leaves"]}
+        self._splits = {tuple(node) for node in state["splits"]}
+        self._key_index = {bytes.fromhex(key): shard_id for key, shard_id in state["keys"].items()}
+        logging.info(f"Loaded {len(self.shards)} holographic shards from {self._meta_file}.")
+
+    def _save_metadata(self):
+        """Atomically persist routing state next to the shard files."""
+        state = {
+            "num_shards": self.num_shards,
+            "loads": {str(shard_id): load for shard_id, load in self._loads.items()},
+            "leaves": [[*node, shard_id] for node, shard_id in self._leaves.items()],
+            "splits": [list(node) for node in self._splits],
+            "keys": {key.hex(): shard_id for key, shard_id in self._key_index.items()},
+        }
+        os.makedirs(os.path.dirname(self._meta_file) or ".", exist_ok=True)
+        tmp_file = self._meta_file + ".tmp"
+        with open(tmp_file, "w") as meta:
+            json.dump(state, meta)
+        os.replace(tmp_file, self._meta_file)
+
+    @staticmethod
+    def key_hash(key):
+        """Stable 8-byte hash of a key vector (independent of process and platform)."""
+        return hashlib.blake2b(np.ascontiguousarray(key, dtype="<f8").tobytes(), digest_size=8).digest()
+
+    def _route(self, key_hash):
+        """
+        Find the shard for a key: the shard already holding it, or the leaf covering its hash.
+        """
+        shard_id = self._key_index.get(key_hash)
+        if shard_id is not None:
+            return shard_id
+        value = int.from_bytes(key_hash, "little")
+        bucket, rest = value % self.num_shards, value // self.num_shards
+        depth, bits = 0, 0
+        while (bucket, depth, bits) in self._splits:
+            bits |= ((rest >> depth) & 1) << depth
+            depth += 1
+        return self._leaves[(bucket, depth, bits)]
+
+    def _assign(self, key_hashes):
+        """
+        Route a batch of keys, registering new ones and counting them toward shard load.
+        :return: List of shard ids, one per key.
+        """
+        with self._lock:
+            shard_ids = []
+            for key_hash in key_hashes:
+                shard_id = self._route(key_hash)
+                if key_hash not in self._key_index:
+                    self._key_index[key_hash] = shard_id
+                    self._loads[shard_id] += 1
+                shard_ids.append(shard_id)
+            return shard_ids
+
+    def _rebalance(self):
+        """
+        Split every leaf shard whose load passed max_load into two fresh children.
+        """
+        with self._lock:
+            split_any = False
+            for node, shard_id in list(self._leaves.items()):
+                if self._loads[shard_id] <= self.max_load:
+                    continue
+                bucket, depth, bits = node
+                del self._leaves[node]
+                self._splits.add(node)
+                self._leaves[(bucket, depth + 1, bits)] = self._new_shard()
+                self._leaves[(bucket, depth + 1, bits | (1 << depth))] = self._new_shard()
+                logging.info(f"[ShardedMemory] Shard {shard_id} reached load {self._loads[shard_id]}; "
+                             f"new keys in its range now go to two new shards.")
+                split_any = True
+            if split_any:
+                self._save_metadata()
+
+    def _mark_dirty(self, writes=1):
+        """
+        Record pending writes and flush shards and routing once the autosave policy says so.
+        :param writes: Number of writes applied since the last call.
+        """
+        with self._lock:
+            self._pending_writes += writes
+            if self.autosave_every is not None and self._pending_writes >= self.autosave_every:
+                self.flush()
+            else:
+                self._save_if_due()
+
+    def _save_if_due(self):
+        """
+        Flush shards and routing once autosave_interval seconds passed since the last save with writes pending.
+        """
+        with self._lock:
+            if self._pending_writes and self.autosave_interval is not None and \
+                    time.monotonic() - self._last_save >= self.autosave_interval:
+                self.flush()
+
+    def _group(self, shard_ids):
+        """Map each shard id to the row indices routed to it."""
+        groups = {}
+        for row, shard_id in enumerate(shard_ids):
+            groups.setdefault(shard_id, []).append(row)
+        return groups
+
+    def encode(self, key, value, regularization):
+        """
+        Encode a key-value pair into the shard its key routes to.
+        """
+        shard_id = self._assign([self.key_hash(key)])[0]
+        self.shards[shard_id].encode(key, value, regularization)
+        self._rebalance()
+
+    def dynamic_encode(self, key, value, **kwargs):
+        """
+        Dynamically encode a key-value pair into the shard its key routes to.
+        """
+        shard_id = self._assign([self.key_hash(key)])[0]
+        self.shards[shard_id].dynamic_encode(key, value, **kwargs)
+        self._rebalance()
+        self._mark_dirty()  # Save according to the autosave policy
+
+    def encode_many(self, keys, values, regularization):
+        """
+        Encode a batch of key-value pairs, encoding each shard's share in parallel threads.
+        :param keys: Key vectors (2D array, one key per row).
+        :param values: Value vectors (2D array, one value per row).
+        :param regularization: Regularization factor (scalar or one value per row).
+        """
+        keys = np.atleast_2d(np.asarray(keys, dtype=float))
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        regularization = np.broadcast_to(np.asarray(regularization, dtype=float), (keys.shape[0],))
+        groups = self._group(self._assign([self.key_hash(key) for key in keys]))
+        futures = [self._executor.submit(self.shards[shard_id].encode_many, keys[rows], values[rows],
+                                         regularization[rows])
+                   for shard_id, rows in groups.items()]
+        for future in futures:
+            future.result()
+        self._rebalance()
+
+    def retrieve(self, key, **kwargs):
+        """
+        Retrieve the value associated with a given key from its shard.
+        """
+        self._save_if_due()  # Reads also check the interval, so writes followed by only reads are saved
+        with self._lock:
+            shard_id = self._route(self.key_hash(key))
+        return self.shards[shard_id].retrieve(key, **kwargs)
+
+    def retrieve_many(self, keys, **kwargs):
+        """
+        Retrieve a batch of keys, querying each shard's share in parallel threads.
+        :param keys: Input key vectors (2D array, one key per row).
+        :param kwargs: Per-call retrieval options (denoise, retrieval) passed to each shard.
+        :return: Retrieved value vectors (2D array, one value per row).
+        """
+        self._save_if_due()
+        keys = np.atleast_2d(np.asarray(keys, dtype=float))
+        with self._lock:
+            groups = self._group([self._route(self.key_hash(key)) for key in keys])
+        results = np.empty((keys.shape[0], self.dimensions))
+        futures = {shard_id: self._executor.submit(self.shards[shard_id].retrieve_many, keys[rows], **kwargs)
+                   for shard_id, rows in groups.items()}
+        for shard_id, future in futures.items():
+            results[groups[shard_id]] = future.result()
+        return results
+
+    def compress_memory(self, threshold=None):
+        """
+        Compress every shard.
+        :return: Average compression ratio across shards.
+        """
+        return float(np.mean([shard.compress_memory(threshold) for shard in self.shards.values()]))
+
+    def save_memory(self):
+        """
+        Save every shard and the routing metadata.
+        """
+        with self._lock:
+            self._save_metadata()  # Routing first: a key it lists but whose shard lacks it is only lost, not misrouted
+            for shard in self.shards.values():
+                shard.save_memory()
+            self._pending_writes = 0
+            self._last_save = time.monotonic()
+
+    def flush(self):
+        """
+        Save shards with unsaved changes and the routing metadata.
+        """
+        with self._lock:
+            self._save_metadata()  # Routing first: a key it lists but whose shard lacks it is only lost, not misrouted
+            for shard in self.shards.values():
+                shard.flush()
+            self._pending_writes = 0
+            self._last_save = time.monotonic()
+
+    def close(self):
+        """
+        Flush, close every shard and stop the worker threads.
+        """
+        self.flush()
+        for shard in self.shards.values():
+            shard.close()
+        self._executor.shutdown()
@@ -0,0 +1,173 @@
+# core/vector_index.py
+
+import os
+import logging
+import threading
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class LSHIndex:
+    def __init__(self, dimensions=1024, num_tables=8, num_bits=12, seed=0, index_file=None, initial_capacity=64):
+        """
+        Approximate nearest-neighbour index using random-hyperplane LSH: each table hashes a vector to
+        the signs of num_bits random projections, so vectors at a small angle share buckets. Queries
+        look at their own bucket and the buckets one bit away in every table, then rank the candidates
+        by exact cosine similarity.
+        :param dimensions: Length of the indexed vectors.
+        :param num_tables: Number of independent hash tables (more tables raise recall).
+        :param num_bits: Hyperplanes per table (more bits make buckets smaller and queries faster).
+        :param seed: Seed of the hyperplanes.
+        :param index_file: Optional .npz path to save/load the indexed vectors.
+        :param initial_capacity: Number of rows allocated up front (grows by doubling).
+        """
+        self.dimensions = dimensions
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.index_file = index_file
+        self.count = 0
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((num_tables * num_bits, dimensions)).astype(np.float32)
+        self._bit_values = 1 << np.arange(num_bits, dtype=np.int64)
+        self._vectors = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._row_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._removed = np.zeros(initial_capacity, dtype=bool)  # Tombstones, dropped on the next save
+        self._domains = []
+        self._buckets = [{} for _ in range(num_tables)]  # per table: code -> list of positions
+        self.generation = None  # Optional id of the data the vectors belong to, saved with them
+        self._dirty = False
+        # Writers and queries share one store across threads (callers, write-behind, retention)
+        self._lock = threading.RLock()
+
+        if index_file and os.path.exists(index_file):
+            logging.info(f"Loading vector index from {index_file}...")
+            with np.load(index_file) as stored:
+                self.add_many(stored["vectors"], stored["row_ids"], stored["domains"].tolist())
+                if "generation" in stored.files:
+                    self.generation = str(stored["generation"])
+            self._dirty = False
+
+    @property
+    def row_ids(self):
+        """Database row ids of the indexed (not removed) vectors, in insertion order."""
+        with self._lock:
+            return self._row_ids[:self.count][~self._removed[:self.count]]
+
+    def _codes(self, vectors):
+        """Bucket code of every vector in every table, as an (n, num_tables) array."""
+        bits = (vectors @ self._planes.T > 0).reshape(len(vectors), self.num_tables, self.num_bits)
+        return bits @ self._bit_values
+
+    def _reserve(self, extra):
+        """Grow the vector matrix so that `extra` more rows fit."""
+        needed = self.count + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[:self.count] = self._vectors[:self.count]
+        row_ids = np.zeros(capacity, dtype=np.int64)
+        row_ids[:self.count] = self._row_ids[:self.count]
+        removed = np.zeros(capacity, dtype=bool)
+        removed[:self.count] = self._removed[:self.count]
+        self._vectors, self._row_ids, self._removed = vectors, row_ids, removed
+
+    def add(self, vector, row_id, domain=None):
+        """
+        Index one vector under its database row id and domain.
+        """
+        self.add_many([vector], [row_id], [domain])
+
+    def add_many(self, vectors, row_ids, domains):
+        """
+        Index a batch of vectors with their database row ids and domains.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        codes = self._codes(vectors)
+        with self._lock:
+            self._reserve(len(vectors))
+            positions = np.arange(self.count, self.count + len(vectors))
+            self._vectors[positions] = vectors
+            self._row_ids[positions] = row_ids
+            self._domains.extend("" if domain is None else str(domain) for domain in domains)
+            for table, table_codes in enumerate(codes.T):
+                buckets = self._buckets[table]
+                for position, code in zip(positions.tolist(), table_codes.tolist()):
+                    buckets.setdefault(code, []).append(position)
+            self.count += len(vectors)
+            self._dirty = True
+
+    def remove_many(self, row_ids):
+        """
+        Remove the vectors indexed under the given database row ids (they stop matching at once
+        and are left out of the next save).
+        :return: Number of vectors removed.
+        """
+        with self._lock:
+            hits = np.isin(self._row_ids[:self.count], row_ids) & ~self._removed[:self.count]
+            self._removed[:self.count] |= hits
+            removed = int(hits.sum())
+            if removed:
+                self._dirty = True
+            return removed
+
+    def _candidates(self, codes):
+        """Positions sharing a bucket with, or one bit away from, the query codes."""
+        probes = np.bitwise_xor.outer(codes, np.r_[0, self._bit_values])  # (num_tables, num_bits + 1)
+        candidates = set()
+        for buckets, table_probes in zip(self._buckets, probes.tolist()):
+            for code in table_probes:
+                candidates.update(buckets.get(code, ()))
+        return np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+
+    def query(self, vector, k=5, domain=None):
+        """
+        Find indexed vectors similar to a query vector.
+        :param vector: Query vector (1D array).
+        :param k: Maximum number of results.
+        :param domain: Only return vectors indexed under this domain (None for all).
+        :return: List of dictionaries with "id" and "similarity" (cosine), best first.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm > 0 else vector
+        codes = self._codes(vector[None])[0]
+        with self._lock:
+            candidates = self._candidates(codes)
+            candidates = candidates[~self._removed[candidates]]
+            if domain is not None:
+                candidates = candidates[[self._domains[position] == domain for position in candidates.tolist()]]
+            if len(candidates) == 0:
+                return []
+            scores = self._vectors[candidates] @ vector
+            top = np.argsort(-scores)[:k]
+            return [{"id": int(self._row_ids[candidates[i]]), "similarity": float(scores[i])} for i in top]
+
+    def save(self):
+        """
+        Save the indexed vectors to index_file (if set); buckets are rebuilt on load.
+        """
+        if not self.index_file:
+            return
+        os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+        tmp_file = self.index_file + ".tmp"
+        with self._lock:
+            live = np.flatnonzero(~self._removed[:self.count])
+            extra = {} if self.generation is None else {"generation": np.array(self.generation)}
+            with open(tmp_file, "wb") as index:
+                np.savez(index, vectors=self._vectors[live], row_ids=self._row_ids[live],
+                         domains=np.array(self._domains, dtype=str)[live], **extra)
+            os.replace(tmp_file, self.index_file)
+            self._dirty = False
+
+    def flush(self):
+        """
+        Save the index if it changed since the last save.
+        """
+        if self._dirty:
+            self.save()
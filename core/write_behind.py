@@ -0,0 +1,129 @@
+# core/write_behind.py
+
+import queue
+import atexit
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class WriteBehindQueue:
+    def __init__(self, sink, max_pending=10000, batch_size=512, name="write-behind"):
+        """
+        Accept writes immediately and persist them from a dedicated writer thread in batches
+        (group commit). put() blocks once max_pending writes are waiting (backpressure), and
+        flush() is a durability barrier for every write accepted before it.
+        :param sink: Callable persisting a list of writes (called from the writer thread only).
+        :param max_pending: Writes waiting in the queue before put() blocks.
+        :param batch_size: Maximum writes handed to the sink at once.
+        :param name: Name of the writer thread.
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._condition = threading.Condition()
+        self._accepted = 0    # Writes accepted by put()
+        self._completed = 0   # Writes the sink has finished with (persisted or failed)
+        self._error = None    # Last sink failure, raised by the next flush()
+        self._putting = 0     # put() calls accepted but not yet in the queue
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        # Queued writes are persisted at interpreter exit even if close() is never called
+        atexit.register(self._close_at_exit)
+
+    @property
+    def pending(self):
+        """Number of accepted writes not yet persisted."""
+        with self._condition:
+            return self._accepted - self._completed
+
+    def put(self, item, timeout=None):
+        """
+        Queue one write, blocking while the queue is full.
+        :param item: Write handed to the sink.
+        :param timeout: Seconds to wait for room (None waits forever); raises queue.Full on expiry.
+        """
+        with self._condition:
+            # Checked under the lock close() takes, so every accepted write is queued before its stop sentinel
+            if self._closed:
+                raise RuntimeError("Cannot write to a closed write-behind queue.")
+            self._accepted += 1
+            self._putting += 1
+        try:
+            self._queue.put(item, timeout=timeout)
+        except queue.Full:
+            with self._condition:
+                self._accepted -= 1
+            raise
+        finally:
+            with self._condition:
+                self._putting -= 1
+                self._condition.notify_all()
+
+    def _run(self):
+        stopping = False
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = stopping or any(item is _STOP for item in batch)
+            writes = [item for item in batch if item is not _STOP]
+            if writes:
+                try:
+                    self.sink(writes)
+                except Exception as e:
+                    logging.error(f"[WriteBehind] Failed to persist {len(writes)} writes: {e}")
+                    with self._condition:
+                        self._error = e
+            with self._condition:
+                self._completed += len(writes)
+                self._condition.notify_all()
+            if stopping and self._queue.empty():
+                return
+
+    def flush(self, timeout=None):
+        """
+        Durability barrier: wait until every write accepted before this call has been persisted.
+        :param timeout: Seconds to wait (None waits forever).
+        :return: True if the barrier was reached, False on timeout.
+        """
+        with self._condition:
+            target = self._accepted
+            reached = self._condition.wait_for(lambda: self._completed >= target, timeout)
+            error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError("Write-behind persistence failed.") from error
+        return reached
+
+    def close(self):
+        """
+        Persist every queued write and stop the writer thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.wait_for(lambda: self._putting == 0)  # Writes accepted before the close
+        atexit.unregister(self._close_at_exit)
+        self._queue.put(_STOP)
+        self._thread.join()
+        with self._condition:
+            error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError("Write-behind persistence failed.") from error
+
+    def _close_at_exit(self):
+        """Exit hook: persist what is still queued, logging (instead of raising) a failed write."""
+        try:
+            self.close()
+        except RuntimeError as e:
+            logging.error(f"[WriteBehind] {e} ({e.__cause__})")
+
+
+# Sentinel telling the writer thread to stop after the writes queued before it
+_STOP = object()
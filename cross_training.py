@@ -5,7 +5,7 @@ from core.meta_entity_core import MetaEntity
 from core.holographic_memory import HolographicMemory
 from core.normal_entity import NormalEntity
 from core.learning_engine import LearningEngine
-from memory_store import MemoryStore
+from memory_store import acquire_store
 import numpy as np
 import logging
 
@@ -16,13 +16,17 @@ def main():
     # Initialize the system
     holographic_memory = HolographicMemory(dimensions=16384)
     meta_entity = MetaEntity("MetaEntity1")
-    learning_engine = LearningEngine(MemoryStore("data/entity_memory.db"))
+    memory_store = acquire_store("data/entity_memory.db", full_text=True)
+    learning_engine = LearningEngine(memory_store)
     
-    # Initialize entities
-    math_entity = NormalEntity("MathEntity", domain="math", learning_engine=learning_engine)
-    english_entity = NormalEntity("EnglishEntity", domain="english", learning_engine=learning_engine)
-    programming_entity = NormalEntity("ProgrammingEntity", domain="python", learning_engine=learning_engine)
-    science_entity = NormalEntity("ScienceEntity", domain="science", learning_engine=learning_engine)
+    # Initialize entities (sharing the store, so their knowledge can be linked across domains)
+    math_entity = NormalEntity("MathEntity", domain="math", learning_engine=learning_engine, memory_store=memory_store)
+    english_entity = NormalEntity("EnglishEntity", domain="english", learning_engine=learning_engine,
+                                  memory_store=memory_store)
+    programming_entity = NormalEntity("ProgrammingEntity", domain="python", learning_engine=learning_engine,
+                                      memory_store=memory_store)
+    science_entity = NormalEntity("ScienceEntity", domain="science", learning_engine=learning_engine,
+                                  memory_store=memory_store)
     
     # Register entities with the meta-entity
     meta_entity.register_normal_entity(math_entity)
@@ -35,6 +39,7 @@ def main():
 
     # Cross-train the system
     total_connections = cross_train_system(math_entity, english_entity, programming_entity, science_entity)
+    total_connections += link_knowledge(memory_store)
 
     # Print the final result with separate lines for "complete" and "total connections"
     print("\n[Training] Cross-training complete!")
@@ -131,5 +136,28 @@ def cross_train_system(math_entity, english_entity, programming_entity, science_
 
     return total_connections
 
+def link_knowledge(memory_store, limit=3, min_score=1.0):
+    """
+    Link stored knowledge across domains with indexed full-text queries: every stored input is
+    searched for in the other domains, and each hit counts as a connection.
+    :param memory_store: MemoryStore opened with full_text=True.
+    :param limit: Maximum links per stored input.
+    :param min_score: Minimum BM25 score of a link (filters matches on common words only).
+    :return: Number of connections made.
+    """
+    print("[Training] Linking knowledge across domains...")
+    linked = set()  # Pairs of row ids, so A <-> B is counted once
+    for row in memory_store.iter_experiences():
+        matches = [match for match in memory_store.search(row["input"], limit=limit + 1)
+                   if match["domain"] != row["domain"] and match["score"] >= min_score]
+        for match in matches[:limit]:
+            pair = frozenset((row["id"], match["id"]))
+            if pair in linked:
+                continue
+            linked.add(pair)
+            print(f"[Cross-Training] {row['domain']}: {row['input']} <-> {match['domain']}: {match['input']} "
+                  f"(score {match['score']:.2f})")
+    return len(linked)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -12,7 +12,7 @@ sys.path.append(root_dir)
 from database_setup import initialize_database
 from entity_controller import EntityController
 from main import main
-from memory_store import MemoryStore
+from memory_store import acquire_store
 from core.holographic_memory import HolographicMemory
 from programming_module import ProgrammingModule
 from core.decision_tree import QuantumDecisionTree
@@ -117,7 +117,7 @@ def test_programming_module():
     print("Testing ProgrammingModule...")
     
     # Initialize LearningEngine with a MemoryStore
-    learning_engine = LearningEngine(MemoryStore("data/test_entity_memory.db"))
+    learning_engine = LearningEngine(acquire_store("data/test_entity_memory.db"))
     
     # Initialize ProgrammingModule with the learning_engine
     module = ProgrammingModule(learning_engine)
@@ -195,7 +195,7 @@ def test_math_module():
 
 def test_python_module():
     print("Testing PythonModule...")
-    learning_engine = LearningEngine(MemoryStore("data/test_entity_memory.db"))
+    learning_engine = LearningEngine(acquire_store("data/test_entity_memory.db"))
     module = PythonModule(learning_engine)
     result = module.process("Write a function to calculate factorial")
     print(f"PythonModule result: {result}")
@@ -203,7 +203,7 @@ def test_python_module():
 
 def test_science_module():
     print("Testing ScienceModule...")
-    learning_engine = LearningEngine(MemoryStore("data/test_entity_memory.db"))
+    learning_engine = LearningEngine(acquire_store("data/test_entity_memory.db"))
     module = ScienceModule(learning_engine)
     result = module.process("Solve a physics problem involving force")
     print(f"ScienceModule result: {result}")
@@ -1,11 +1,11 @@
 # domains/math_module.py
 
 import numpy as np
-from core.holographic_memory import HolographicMemory
+from core.memory_registry import acquire_memory
 
 class MathModule:
-    def __init__(self, memory_dimensions=16384, memory_store=None):
-        self.memory = HolographicMemory(dimensions=memory_dimensions)
+    def __init__(self, memory_dimensions=16384, memory_store=None, memory_backend="holographic"):
+        self.memory = acquire_memory(dimensions=memory_dimensions, backend=memory_backend)
         self.memory_store = memory_store
 
     def store_math_problem(self, problem, solution):
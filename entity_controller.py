@@ -13,14 +13,14 @@ from domains.math_module import MathModule
 from domains.english_module import EnglishModule
 from programming_module import ProgrammingModule
 from core.learning_engine import LearningEngine
-from memory_store import MemoryStore
-from core.holographic_memory import HolographicMemory  # Import HolographicMemory
+from memory_store import acquire_store
+from core.memory_registry import acquire_memory  # Shared HolographicMemory instances
 
 class EntityController:
     def __init__(self):
         # Initialize the LearningEngine with a MemoryStore and HolographicMemory
-        self.holographic_memory = HolographicMemory(dimensions=16384)  # Add holographic memory
-        learning_engine = LearningEngine(MemoryStore("data/entity_memory.db"))
+        self.holographic_memory = acquire_memory(dimensions=16384)  # Shared holographic memory
+        learning_engine = LearningEngine(acquire_store("data/entity_memory.db"))
 
         # Initialize modules with required arguments
         self.math_module = MathModule()
@@ -5,14 +5,14 @@ from core.meta_entity_core import MetaEntity
 from core.holographic_memory import HolographicMemory
 from core.normal_entity import NormalEntity
 from core.learning_engine import LearningEngine
-from memory_store import MemoryStore
+from memory_store import acquire_store
 import numpy as np
 
 def main():
     # Initialize the system
     holographic_memory = HolographicMemory(dimensions=16384)
     meta_entity = MetaEntity("MetaEntity1")
-    learning_engine = LearningEngine(MemoryStore("data/entity_memory.db"))
+    learning_engine = LearningEngine(acquire_store("data/entity_memory.db"))
     
     # Initialize entities
     math_entity = NormalEntity("MathEntity", domain="math", learning_engine=learning_engine)
@@ -2,16 +2,16 @@
 
 from core.entity_core import SuperEntity
 from core.meta_entity_core import MetaEntity
-from core.holographic_memory import HolographicMemory
+from core.memory_registry import acquire_memory
 from core.normal_entity import NormalEntity
 from core.learning_engine import LearningEngine
-from memory_store import MemoryStore
+from memory_store import acquire_store
 import numpy as np
 
 def main():
     # Initialize HolographicMemory
     memory_dimensions = 16384
-    holographic_memory = HolographicMemory(dimensions=memory_dimensions)
+    holographic_memory = acquire_memory(dimensions=memory_dimensions)
 
     # Initialize 2 MetaEntities
     meta_entity1 = MetaEntity("MetaEntity1")
@@ -24,7 +24,7 @@ def main():
     meta_entity2.register_entity(super_entity2)
 
     # Initialize 2 NormalEntities with LearningEngine and MemoryStore
-    learning_engine = LearningEngine(MemoryStore("data/entity_memory.db"))
+    learning_engine = LearningEngine(acquire_store("data/entity_memory.db"))
     normal_entity1 = NormalEntity("NormalEntity1", domain="math", learning_engine=learning_engine)
     normal_entity2 = NormalEntity("NormalEntity2", domain="english", learning_engine=learning_engine)
     meta_entity1.register_normal_entity(normal_entity1)
@@ -1,127 +1,212 @@
 # memory_store.py
 
 import os
+import re
+import hashlib
 import sqlite3
+import uuid
+import inspect
 import numpy as np
 import json  # Add this import
-from scipy.fft import fft, ifft
-from scipy.ndimage import gaussian_filter1d
-from scipy.signal import medfilt
+import atexit
 import logging
+import weakref
+import threading
+from datetime import datetime, timedelta
+from core.memory_registry import DEFAULT_MEMORY_FILES, acquire_memory, release_memory
+from core.connection_pool import ConnectionPool
+from core.item_memory import ItemMemory
+from core.vector_index import LSHIndex
+from core.write_behind import WriteBehindQueue
+from utils.text_encoder import encode_text, encode_texts
+from utils.hyperdimensional_utils import get_ngram_encoder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class HolographicMemory:
-    def __init__(self, dimensions=16384, initial_regularization=1e-6, memory_file="data/holographic_memory.npy"):
-        """
-        Initialize holographic memory with a high-dimensional space.
-        :param dimensions: Number of dimensions for memory representation.
-        :param initial_regularization: Starting regularization value for iterative encoding.
-        :param memory_file: File path to save/load the memory space for persistence.
-        """
-        self.dimensions = dimensions
-        self.initial_regularization = initial_regularization
-        self.memory_file = memory_file
+# Storage type of the input/output embedding BLOBs (half precision: 2 KB per 1024-d vector)
+EMBEDDING_DTYPE = np.dtype("<f2")
+EMBEDDING_COLUMNS = {"input_embedding": "BLOB", "output_embedding": "BLOB"}
 
-        # Load memory space from disk if it exists, otherwise initialize to zero
-        if os.path.exists(self.memory_file):
-            logging.info(f"Loading holographic memory from {self.memory_file}...")
-            self.memory_space = np.load(self.memory_file)
-        else:
-            logging.info(f"Initializing new holographic memory with {dimensions} dimensions.")
-            self.memory_space = np.zeros(dimensions, dtype=complex)
+# Deduplication columns: repeated facts bump hit_count and last_seen instead of adding a row
+FACT_COLUMNS = {"content_hash": "TEXT", "hit_count": "INTEGER NOT NULL DEFAULT 1", "last_seen": "DATETIME"}
 
-    def save_memory(self):
-        """
-        Save the memory space to disk for persistence.
-        """
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
-        np.save(self.memory_file, self.memory_space)
-        logging.info(f"Holographic memory saved to {self.memory_file}.")
+# Columns added to knowledge tables created before they existed (the domain databases in data/ predate
+# the domain column), in the order they are added
+MIGRATED_COLUMNS = {"domain": "TEXT", **EMBEDDING_COLUMNS, **FACT_COLUMNS}
 
-    def normalize(self, vector):
-        """Normalize a vector to unit length."""
-        norm = np.linalg.norm(vector)
-        return vector / norm if norm != 0 else vector
+# Columns returned by the read APIs
+KNOWLEDGE_COLUMNS = ("id", "input", "output", "domain", "timestamp", "hit_count", "last_seen")
 
-    def encode(self, key, value, regularization):
-        """
-        Encode a key-value pair into holographic memory.
-        :param key: Key vector (1D array).
-        :param value: Value vector (1D array).
-        :param regularization: Regularization factor to adjust encoding strength.
-        """
-        key = self.normalize(key)
-        value = self.normalize(value)
-        key_fft = fft(key, n=self.dimensions)
-        value_fft = fft(value, n=self.dimensions)
-        self.memory_space += key_fft * value_fft * (1 + regularization)
+# Insert a fact, or count one more sighting of an identical stored fact
+UPSERT_KNOWLEDGE = """
+    INSERT INTO knowledge (input, output, domain, input_embedding, output_embedding, content_hash, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (content_hash) DO UPDATE SET hit_count = hit_count + 1, last_seen = CURRENT_TIMESTAMP
+"""
 
-    def retrieve(self, key):
-        """
-        Retrieve the value associated with a given key.
-        :param key: Input key vector (1D array).
-        :return: Retrieved value vector (1D array).
-        """
-        key = self.normalize(key)
-        key_fft = fft(key, n=self.dimensions)
-        retrieved_fft = self.memory_space / (key_fft + 1e-9)  # Avoid division by zero
-        retrieved_value = np.real(ifft(retrieved_fft))
-        return self.noise_reduction(retrieved_value)
+# Connection profile: WAL lets readers run beside the writer, NORMAL sync is durable at checkpoints
+# under WAL, and a 64 MB page cache plus 256 MB of memory-mapped I/O keep hot pages out of syscalls.
+# Incremental auto-vacuum (fixed when a database is created) lets retention return freed pages in steps.
+SQLITE_PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+}
 
-    def noise_reduction(self, value, gaussian_sigma=2, median_width=3):
-        """
-        Apply noise reduction to the retrieved value using Gaussian and median filters.
-        :param value: Input vector (1D array).
-        :param gaussian_sigma: Sigma for Gaussian filter.
-        :param median_width: Kernel size for median filter.
-        :return: Denoised value vector.
-        """
-        value = gaussian_filter1d(value, sigma=gaussian_sigma)
-        value = medfilt(value, kernel_size=median_width)
-        return value
 
-    def dynamic_encode(self, key, value, max_iterations=10, tolerance=1e-4):
-        """
-        Dynamically encode a key-value pair using adaptive regularization.
-        :param key: Key vector (1D array).
-        :param value: Value vector (1D array).
-        :param max_iterations: Maximum number of encoding iterations.
-        :param tolerance: Tolerance for convergence.
-        """
-        for i in range(max_iterations):
-            regularization = self.initial_regularization * np.exp(-i / 10)  # Adaptive regularization
-            previous_memory = self.memory_space.copy()
-            self.encode(key, value, regularization)
-            if np.linalg.norm(self.memory_space - previous_memory) < tolerance:
-                logging.info(f"[HolographicMemory] Converged after {i + 1} iterations.")
-                break
-        self.save_memory()  # Save memory after encoding
+# Full-text index over knowledge input/output, an external-content FTS5 table kept in sync by triggers
+# (upserts only touch hit_count/last_seen, so they never rewrite the index)
+FULL_TEXT_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+           input, output, content='knowledge', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+           INSERT INTO knowledge_fts (rowid, input, output) VALUES (new.id, new.input, new.output);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+           INSERT INTO knowledge_fts (knowledge_fts, rowid, input, output) VALUES ('delete', old.id, old.input, old.output);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE OF input, output ON knowledge BEGIN
+           INSERT INTO knowledge_fts (knowledge_fts, rowid, input, output) VALUES ('delete', old.id, old.input, old.output);
+           INSERT INTO knowledge_fts (rowid, input, output) VALUES (new.id, new.input, new.output);
+       END""",
+)
+# Words of a free-text query (FTS5 operators and punctuation are never passed through)
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+# Rows read, encoded and added per step when backfilling the trace or input index on open
+BACKFILL_CHUNK_SIZE = 2048
+
+# Retention policy key matching every domain that has no policy of its own
+DEFAULT_RETENTION = "*"
 
-    def compress_memory(self, threshold=None):
-        """
-        Compress the memory by removing low-magnitude elements.
-        :param threshold: Threshold for compression. If None, use adaptive thresholding.
-        :return: Compression ratio (percentage of memory retained).
-        """
-        if threshold is None:
-            threshold = np.percentile(np.abs(self.memory_space), 75)  # Retain 25% of memory
-        mask = np.abs(self.memory_space) > threshold
-        retained_elements = np.sum(mask)
-        compression_ratio = retained_elements / self.dimensions
-        self.memory_space[~mask] = 0
-        self.save_memory()  # Save memory after compression
-        return compression_ratio
+
+def embedding_to_blob(vector):
+    """Serialize an embedding vector into a compact BLOB."""
+    return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def blob_to_embedding(blob):
+    """Deserialize an embedding BLOB (None stays None)."""
+    return None if blob is None else np.frombuffer(blob, dtype=EMBEDDING_DTYPE).astype(float)
+
+
+def encoded_vector(text, blob):
+    """
+    Vector a stored text was encoded with: re-encoded from the text when that reproduces its
+    half-precision BLOB (always for outputs and string inputs), otherwise decoded from the BLOB.
+    Encoding and forgetting with the same full-precision vectors keeps subtraction from the trace exact.
+    """
+    vector = encode_text(text)
+    if blob is None or embedding_to_blob(vector) == blob:
+        return vector
+    return blob_to_embedding(blob)
+
+
+def content_hash(input_text, output_text, domain):
+    """Hex digest identifying a fact by its stored input, output and domain."""
+    fact = "\x1f".join("" if part is None else str(part) for part in (input_text, output_text, domain))
+    return hashlib.blake2b(fact.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def default_trace_file(db_path, backend="holographic"):
+    """Trace file a MemoryStore uses for a database unless told otherwise: "<db stem>_trace" plus the
+    backend's trace extension, so every database has a trace that rebuild_traces can regenerate."""
+    extension = os.path.splitext(DEFAULT_MEMORY_FILES.get(backend, ".npy"))[1]
+    return f"{os.path.splitext(db_path)[0]}_trace{extension}"
+
+
+def _flush_sidecars(holographic_memory, item_memory, input_index):
+    """Save the trace (if any) before the cleanup memory that records which rows it holds, then the index."""
+    if holographic_memory is not None:
+        holographic_memory.flush()
+    item_memory.flush()
+    input_index.flush()
 
 
 class MemoryStore:
-    def __init__(self, db_path, holographic_dimensions=16384, regularisation=0.01):
+    def __init__(self, db_path, holographic_dimensions=16384, regularisation=0.01, holographic_dtype="complex128",
+                 min_confidence=0.15, holographic_memory_file=None, fft_backend="scipy", fft_workers=None,
+                 retrieval="correlation", holographic_backend="holographic", pragmas=SQLITE_PRAGMAS,
+                 write_behind=False, write_queue_size=10000, retention=None, retention_interval=None,
+                 retention_batch_size=500, full_text=False):
+        """
+        Persistent knowledge store: a SQLite knowledge table plus a shared holographic trace, a cleanup
+        item memory and a similarity index over the stored inputs.
+        :param db_path: Path of the SQLite database.
+        :param holographic_dimensions: Dimensions of the holographic trace.
+        :param regularisation: Initial regularization of the trace encodes.
+        :param holographic_dtype: Precision tier of the trace ("holographic" backend only).
+        :param min_confidence: Minimum cleanup-memory confidence for retrieve_holographic() to return a stored output.
+        :param holographic_memory_file: Trace file (defaults to the database's own trace, see default_trace_file).
+        :param fft_backend: FFT implementation of the trace.
+        :param fft_workers: Threads per FFT.
+        :param retrieval: Unbinding operator used for recall.
+        :param holographic_backend: "holographic" or "binary".
+        :param pragmas: PRAGMA name -> value applied to every connection.
+        :param write_behind: Persist writes from a background writer thread (see flush(); writes still
+                             queued at interpreter exit are persisted then, even without close()).
+        :param write_queue_size: Writes queued before store_knowledge blocks (write_behind only).
+        :param retention: Dictionary of domain (or DEFAULT_RETENTION) -> policy, where a policy may set
+                          "ttl" (seconds or timedelta since a fact was last seen) and "max_rows" (rows kept,
+                          most recently seen first). None keeps everything.
+        :param retention_interval: Seconds between background apply_retention() runs (None runs it only
+                                   when called).
+        :param retention_batch_size: Rows deleted per transaction by apply_retention().
+        :param full_text: Maintain the FTS5 index used by search() (kept once created).
+        """
         self.db_path = db_path
+        self.pragmas = pragmas
         self.ensure_directory_exists()
-        self.conn = sqlite3.connect(db_path)
-        self.holographic_memory = HolographicMemory(dimensions=holographic_dimensions, initial_regularization=regularisation)
+        # Each thread (callers, the write-behind writer) gets its own pooled connection
+        self._pool = ConnectionPool(db_path, pragmas)
+        # FFT options only apply to the complex holographic backend
+        options = {} if holographic_backend == "binary" else dict(
+            initial_regularization=regularisation, fft_backend=fft_backend, fft_workers=fft_workers)
+        trace_file = holographic_memory_file or default_trace_file(db_path, holographic_backend)
+        new_trace = not os.path.exists(trace_file)
+        self.holographic_memory = acquire_memory(memory_file=trace_file, dimensions=holographic_dimensions,
+                                                 dtype=holographic_dtype, backend=holographic_backend, **options)
+        # Cleanup memory mapping retrieved vectors back to stored outputs
+        self.item_memory = ItemMemory(memory_file=f"{os.path.splitext(db_path)[0]}_items.npz")
+        # Near-duplicate lookup over n-gram embeddings of the stored inputs
+        self.input_encoder = get_ngram_encoder(dimensions=1024, n=3)
+        self.input_index = LSHIndex(dimensions=1024, index_file=f"{os.path.splitext(db_path)[0]}_index.npz")
+        self.min_confidence = min_confidence
+        self.retrieval = retrieval  # Correlation recalls far more pairs per dimension than the inverse
+        # The trace is saved before the cleanup memory, which records the rows it holds (see _encode_missing_rows)
+        weakref.finalize(self, _flush_sidecars, self.holographic_memory, self.item_memory, self.input_index)
+        self.full_text = full_text
+        self.generation = None  # Id of the knowledge table, see _initialize_generation
         self._initialize_db()
+        self._discard_stale_sidecars(new_trace)
+        self._encode_missing_rows()
+        self._build_input_index()
+
+        # Opt-in asynchronous persistence: writes are group-committed by a writer thread on its own connection.
+        # The queue's exit hook is registered after the sidecar finalizer, so it runs first (atexit is LIFO)
+        self._writes = None
+        if write_behind:
+            self._writes = WriteBehindQueue(lambda rows: self._persist_many(self.conn, rows),
+                                            max_pending=write_queue_size, name=f"write-behind:{db_path}")
+
+        # Optional retention, applied in small batches by a background thread every retention_interval seconds
+        self.retention = retention or {}
+        self.retention_batch_size = retention_batch_size
+        self._retention_stop = threading.Event()
+        self._retention_thread = None
+        if self.retention and retention_interval:
+            self._retention_thread = threading.Thread(target=self._run_retention, args=(retention_interval,),
+                                                      name=f"retention:{db_path}", daemon=True)
+            self._retention_thread.start()
+
+    @property
+    def conn(self):
+        """Database connection of the calling thread."""
+        return self._pool.connection()
 
     def ensure_directory_exists(self):
         """Ensure the directory for the database exists."""
@@ -133,6 +218,7 @@ class MemoryStore:
         """Initialize the SQLite database with the required table."""
         try:
             with self.conn:
+                created = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'knowledge'").fetchone() is None
                 self.conn.execute("""
                     CREATE TABLE IF NOT EXISTS knowledge (
                         id INTEGER PRIMARY KEY,
@@ -142,74 +228,643 @@ class MemoryStore:
                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                # Columns missing from databases created by older versions
+                columns = {row[1] for row in self.conn.execute("PRAGMA table_info(knowledge)")}
+                for column, column_type in MIGRATED_COLUMNS.items():
+                    if column not in columns:
+                        self.conn.execute(f"ALTER TABLE knowledge ADD COLUMN {column} {column_type}")
+                self._deduplicate()
+                self._initialize_generation(created)
+                # Exact-hit lookups by (domain, input) and time-ordered scans
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_domain_input ON knowledge (domain, input)")
+                # Exact-hit lookups across every domain
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_input ON knowledge (input)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_timestamp ON knowledge (timestamp)")
+                # Keyset pages of one domain in (timestamp, id) order, without re-sorting the domain per page
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_domain_timestamp ON knowledge (domain, timestamp, id)")
+                # Most-repeated facts first, for cache warming
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_hit_count ON knowledge (hit_count)")
+                # Retention scans per domain in last-seen order
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_domain_last_seen ON knowledge (domain, last_seen)")
             logging.info(f"Database initialized at {self.db_path}.")
         except sqlite3.Error as e:
             logging.error(f"Database initialization failed: {e}")
+        self._initialize_full_text()
+
+    def _initialize_generation(self, created):
+        """
+        Give the knowledge table a random generation id, renewed whenever the table is created, so
+        sidecars saved for an earlier table (e.g. before a reset, when row ids restart at 1) are
+        recognized. Tables from older versions get one on first open.
+        :param created: The knowledge table was created just now.
+        """
+        self.conn.execute("CREATE TABLE IF NOT EXISTS knowledge_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.execute(f"INSERT OR {'REPLACE' if created else 'IGNORE'} INTO knowledge_meta (key, value) "
+                          f"VALUES ('generation', ?)", (uuid.uuid4().hex,))
+        self.generation = self.conn.execute("SELECT value FROM knowledge_meta WHERE key = 'generation'").fetchone()[0]
+
+    def _discard_stale_sidecars(self, new_trace):
+        """
+        Empty the cleanup memory and input index if they were saved for another knowledge table
+        generation, and the cleanup memory if the trace it describes is new (older versions shared
+        one default trace between all stores); the rows are then encoded and indexed again.
+        Sidecars from before generations existed are kept while the table they describe has rows.
+        :param new_trace: The trace file did not exist when the store opened it.
+        """
+        if self.generation is None:
+            return  # The database could not be initialized
+        has_rows = self.conn.execute("SELECT 1 FROM knowledge LIMIT 1").fetchone() is not None
+        for sidecar in (self.item_memory, self.input_index):
+            stale = sidecar.generation != self.generation and not (sidecar.generation is None and has_rows)
+            if sidecar is self.item_memory:
+                stale = stale or new_trace
+            if stale and len(sidecar.row_ids):
+                logging.info(f"Discarding {len(sidecar.row_ids)} stale sidecar rows of {self.db_path}.")
+                sidecar.remove_many(sidecar.row_ids)
+            sidecar.generation = self.generation  # Saved with the sidecar's next change
+
+    def _initialize_full_text(self):
+        """Create (and fill from existing rows) the full-text index if requested; reuse one that exists."""
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'knowledge_fts'").fetchone() is not None
+        self.full_text = self.full_text or exists
+        if not self.full_text or exists:
+            return
+        try:
+            with self.conn:
+                for statement in FULL_TEXT_SCHEMA:
+                    self.conn.execute(statement)
+                self.conn.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('rebuild')")
+            logging.info(f"Full-text index created for {self.db_path}.")
+        except sqlite3.Error as e:
+            logging.error(f"Full-text index creation failed (is FTS5 available?): {e}")
+            self.full_text = False
+
+    def _deduplicate(self):
+        """
+        Hash rows stored before content hashes existed and, on first migration, fold duplicate
+        facts into their oldest row before the unique index is created.
+        """
+        self.conn.create_function("content_hash", 3, content_hash, deterministic=True)
+        self.conn.execute("""
+            UPDATE knowledge SET content_hash = content_hash(input, output, domain),
+                                 last_seen = coalesce(last_seen, timestamp)
+            WHERE content_hash IS NULL
+        """)
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_knowledge_content_hash'").fetchone():
+            return
+        duplicates = self.conn.execute("""
+            SELECT content_hash, min(id), sum(hit_count), max(last_seen) FROM knowledge
+            GROUP BY content_hash HAVING count(*) > 1
+        """).fetchall()
+        for fact_hash, keep_id, hit_count, last_seen in duplicates:
+            self.conn.execute("UPDATE knowledge SET hit_count = ?, last_seen = ? WHERE id = ?",
+                              (hit_count, last_seen, keep_id))
+            self.conn.execute("DELETE FROM knowledge WHERE content_hash = ? AND id != ?", (fact_hash, keep_id))
+        if duplicates:
+            logging.info(f"Merged duplicate knowledge into {len(duplicates)} rows.")
+        self.conn.execute("CREATE UNIQUE INDEX idx_knowledge_content_hash ON knowledge (content_hash)")
+
+    def _encode_missing_rows(self):
+        """
+        Encode committed rows that the trace and cleanup memory lost (e.g. in a crash before they were
+        saved); otherwise deduplication would keep them unrecallable. The cleanup memory records the
+        rows encoded into the trace and is always saved after it, so a row it lacks is re-encoded:
+        at worst twice in the trace, never lost. Rows are encoded in id order, so only ids past the
+        last recorded one are read, BACKFILL_CHUNK_SIZE rows at a time.
+        """
+        row_ids = self.item_memory.row_ids
+        last_encoded = int(row_ids.max()) if len(row_ids) else 0
+        cursor = self.conn.execute("SELECT id, input, output, input_embedding, output_embedding FROM knowledge "
+                                   "WHERE id > ? ORDER BY id", (last_encoded,))
+        encoded = 0
+        while True:
+            rows = cursor.fetchmany(BACKFILL_CHUNK_SIZE)
+            if not rows:
+                break
+            keys = np.array([encoded_vector(row[1], row[3]) for row in rows])
+            values = np.array([encoded_vector(row[2], row[4]) for row in rows])
+            self.holographic_memory.dynamic_encode_many(keys, values)
+            self.item_memory.add_many(values, [row[0] for row in rows], [row[2] for row in rows])
+            encoded += len(rows)
+        if encoded:
+            logging.info(f"Encoded {encoded} stored rows missing from the holographic trace.")
+
+    def _build_input_index(self):
+        """
+        Index rows stored after the index was last saved, or before it existed (e.g. a database from an
+        older version). Rows are indexed in id order, so only ids past the last indexed one are read,
+        BACKFILL_CHUNK_SIZE rows at a time.
+        """
+        row_ids = self.input_index.row_ids
+        last_indexed = int(row_ids.max()) if len(row_ids) else 0
+        cursor = self.conn.execute("SELECT id, input, domain FROM knowledge WHERE id > ? ORDER BY id", (last_indexed,))
+        indexed = 0
+        while True:
+            rows = cursor.fetchmany(BACKFILL_CHUNK_SIZE)
+            if not rows:
+                break
+            row_ids, inputs, domains = zip(*rows)
+            self.input_index.add_many(self.input_encoder.encode_many(inputs), row_ids, domains)
+            indexed += len(rows)
+        if indexed:
+            logging.info(f"Indexed {indexed} stored inputs for similarity search.")
 
     def store_knowledge(self, input_data, output_data, domain):
         """
-        Store knowledge in the database.
+        Store knowledge in the database. Storing a fact that is already stored only bumps its
+        hit_count and last_seen, and does not add it to the holographic trace again.
         :param input_data: Input data (e.g., task or query).
         :param output_data: Output data (e.g., result or response).
         :param domain: Domain of the knowledge (e.g., math, english, programming).
+        With write_behind, the write is queued and persisted later (see flush()).
         """
+        if self._writes is not None:
+            self._writes.put((input_data, output_data, domain))  # Blocks while the queue is full
+            return
+        # Serialize output_data if it's not a string
+        if not isinstance(output_data, str):
+            output_data = json.dumps(output_data)  # Convert to JSON string
+        key = self._text_to_vector(input_data)
+        value = self._text_to_vector(output_data)
         try:
-            # Serialize output_data if it's not a string
-            if not isinstance(output_data, str):
-                output_data = json.dumps(output_data)  # Convert to JSON string
-
             with self.conn:
-                self.conn.execute("""
-                    INSERT INTO knowledge (input, output, domain) VALUES (?, ?, ?)
-                """, (str(input_data), output_data, domain))
-            logging.info(f"Knowledge stored: {input_data} -> {output_data} in domain {domain}")
+                row_id, hit_count = self.conn.execute(UPSERT_KNOWLEDGE + " RETURNING id, hit_count", (
+                    str(input_data), output_data, domain, embedding_to_blob(key), embedding_to_blob(value),
+                    content_hash(input_data, output_data, domain))).fetchone()
+            is_new = hit_count == 1
+            if is_new:
+                logging.info(f"Knowledge stored: {input_data} -> {output_data} in domain {domain}")
+            else:
+                logging.info(f"Knowledge seen again ({hit_count} times): {input_data} -> {output_data} in domain {domain}")
         except sqlite3.Error as e:
             logging.error(f"Failed to store knowledge: {e}")
+            return  # Only committed rows are encoded
 
+        if not is_new:
+            return
         # Holographic storage
-        key = self._text_to_vector(input_data)
-        value = self._text_to_vector(output_data)
         self.holographic_memory.dynamic_encode(key, value)
+        self.item_memory.add(value, row_id, output_data)
+        self.input_index.add(self.input_encoder.encode(str(input_data)), row_id, domain)
+
+    def store_knowledge_many(self, rows):
+        """
+        Store a batch of knowledge in one transaction and encode it in one holographic pass.
+        :param rows: Iterable of (input_data, output_data, domain) tuples.
+        :return: Database row ids of the stored rows, one per input row (repeated facts give the id
+                 of the existing row; empty if the upsert failed; None when queued for write-behind
+                 persistence).
+        """
+        if self._writes is not None:
+            for row in rows:
+                self._writes.put(row)
+            return None
+        try:
+            return self._persist_many(self.conn, list(rows))
+        except sqlite3.Error:
+            return []
+
+    def _persist_many(self, conn, rows):
+        """
+        Upsert rows through a connection and add the new facts to the trace, item memory and input index.
+        A failed upsert is logged and re-raised (so the write-behind queue reports it from flush()),
+        and nothing is encoded for it.
+        """
+        if not rows:
+            return []
+        inputs = [input_data for input_data, _, _ in rows]
+        outputs = [output_data if isinstance(output_data, str) else json.dumps(output_data)
+                   for _, output_data, _ in rows]
+        domains = [domain for _, _, domain in rows]
+        hashes = [content_hash(*row) for row in zip(map(str, inputs), outputs, domains)]
+        keys = encode_texts(inputs)
+        values = encode_texts(outputs)
+        hash_list = json.dumps(sorted(set(hashes)))
+        try:
+            with conn:
+                # Take the write lock first, so no other connection stores these facts in between
+                conn.execute("BEGIN IMMEDIATE")
+                stored = {row[0] for row in conn.execute(
+                    "SELECT content_hash FROM knowledge WHERE content_hash IN (SELECT value FROM json_each(?))",
+                    (hash_list,))}
+                conn.executemany(UPSERT_KNOWLEDGE, zip(map(str, inputs), outputs, domains, map(embedding_to_blob, keys),
+                                                       map(embedding_to_blob, values), hashes))
+                ids = dict(conn.execute(
+                    "SELECT content_hash, id FROM knowledge WHERE content_hash IN (SELECT value FROM json_each(?))",
+                    (hash_list,)))
+            row_ids = [ids[fact_hash] for fact_hash in hashes]
+        except sqlite3.Error as e:
+            logging.error(f"Failed to store knowledge: {e}")
+            raise
+
+        # Only facts seen for the first time (and only their first occurrence in the batch) are encoded
+        new = []
+        for i, fact_hash in enumerate(hashes):
+            if fact_hash not in stored:
+                stored.add(fact_hash)
+                new.append(i)
+        logging.info(f"Knowledge stored: {len(new)} new rows, {len(rows) - len(new)} repeated.")
+        if not new:
+            return row_ids
+        # Holographic storage
+        self.holographic_memory.dynamic_encode_many(keys[new], values[new])
+        self.item_memory.add_many(values[new], [row_ids[i] for i in new], [outputs[i] for i in new])
+        self.input_index.add_many(self.input_encoder.encode_many([str(inputs[i]) for i in new]),
+                                  [row_ids[i] for i in new], [domains[i] for i in new])
+        return row_ids
+
+    @staticmethod
+    def _row_to_dict(row):
+        return dict(zip(KNOWLEDGE_COLUMNS, row))
+
+    def lookup(self, input_data, domain=None):
+        """
+        Exact-match lookup of stored knowledge (an index seek, with or without a domain).
+        :param input_data: Input exactly as it was stored (compared via str()).
+        :param domain: Domain of the knowledge (None searches every domain).
+        :return: The most recent matching row as a dictionary, or None.
+        """
+        columns = ", ".join(KNOWLEDGE_COLUMNS)
+        if domain is None:
+            row = self.conn.execute(f"SELECT {columns} FROM knowledge WHERE input = ? ORDER BY id DESC LIMIT 1",
+                                    (str(input_data),)).fetchone()
+        else:
+            row = self.conn.execute(f"SELECT {columns} FROM knowledge WHERE domain = ? AND input = ? "
+                                    f"ORDER BY id DESC LIMIT 1", (domain, str(input_data))).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def iter_experiences(self, domain=None, since=None, batch_size=500):
+        """
+        Stream stored knowledge in (timestamp, id) order, one keyset-paginated batch at a time,
+        without loading the whole table.
+        :param domain: Only yield rows of this domain (None for all).
+        :param since: Only yield rows stored at or after this time (datetime or "YYYY-MM-DD HH:MM:SS").
+        :param batch_size: Rows fetched per query.
+        :return: Generator of row dictionaries.
+        """
+        if isinstance(since, datetime):
+            since = since.strftime("%Y-%m-%d %H:%M:%S")
+        conditions, parameters = [], []
+        if domain is not None:
+            conditions.append("domain = ?")
+            parameters.append(domain)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            parameters.append(since)
+        columns = ", ".join(KNOWLEDGE_COLUMNS)
+        last = None
+        while True:
+            page_conditions = conditions + (["(timestamp, id) > (?, ?)"] if last else [])
+            where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+            rows = self.conn.execute(f"SELECT {columns} FROM knowledge {where} ORDER BY timestamp, id LIMIT ?",
+                                     parameters + (list(last) if last else []) + [batch_size]).fetchall()
+            for row in rows:
+                yield self._row_to_dict(row)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][4], rows[-1][0])
+
+    def retrieve_experiences(self, domain=None, limit=100):
+        """
+        Return the most recently stored knowledge.
+        :param domain: Only return rows of this domain (None for all).
+        :param limit: Maximum number of rows.
+        :return: List of row dictionaries, newest first.
+        """
+        columns = ", ".join(KNOWLEDGE_COLUMNS)
+        where, parameters = ("WHERE domain = ?", [domain]) if domain is not None else ("", [])
+        rows = self.conn.execute(f"SELECT {columns} FROM knowledge {where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                                 parameters + [limit]).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def frequent_experiences(self, domain=None, limit=100):
+        """
+        Return the most often stored facts (e.g. to warm caches at startup).
+        :param domain: Only return rows of this domain (None for all).
+        :param limit: Maximum number of rows.
+        :return: List of row dictionaries, highest hit_count first.
+        """
+        columns = ", ".join(KNOWLEDGE_COLUMNS)
+        where, parameters = ("WHERE domain = ?", [domain]) if domain is not None else ("", [])
+        rows = self.conn.execute(f"SELECT {columns} FROM knowledge {where} ORDER BY hit_count DESC, last_seen DESC "
+                                 f"LIMIT ?", parameters + [limit]).fetchall()
+        return [self._row_to_dict(row) for row in rows]
 
     def retrieve_holographic(self, query_text):
         """
         Retrieve knowledge using holographic memory.
         :param query_text: Text query to find matching knowledge.
-        :return: Retrieved knowledge as text.
+        :return: The best-matching stored output, or a summary of the raw vector if no stored
+                 output matches with at least min_confidence.
         """
         try:
             query_vector = self._text_to_vector(query_text)
-            result_vector = self.holographic_memory.retrieve(query_vector)
+            # The cleanup match tolerates noise, so skip the denoising filters
+            result_vector = self.holographic_memory.retrieve(query_vector, denoise="none", retrieval=self.retrieval)
+            matches = self.item_memory.match(result_vector)
+            if matches and matches[0]["confidence"] >= self.min_confidence:
+                return matches[0]["output"]
             return self._vector_to_text(result_vector)
         except Exception as e:
             logging.error(f"Failed to retrieve knowledge: {e}")
             return None
 
+    def recall(self, query_text, k=1):
+        """
+        Recall stored outputs for a query through holographic memory and the cleanup memory.
+        :param query_text: Text query to find matching knowledge.
+        :param k: Number of candidate outputs to return.
+        :return: List of dictionaries with "id", "output" and "confidence", best first.
+        """
+        query_vector = self._text_to_vector(query_text)
+        result_vector = self.holographic_memory.retrieve(query_vector, denoise="none", retrieval=self.retrieval)
+        return self.item_memory.match(result_vector, k)
+
+    def search(self, text, domain=None, limit=10):
+        """
+        Ranked full-text search over stored inputs and outputs (requires full_text=True).
+        Any word of the query may match; rows matching more, and rarer, words rank higher (BM25),
+        and words match their inflections ("plants" finds "plant").
+        :param text: Free-text query.
+        :param domain: Only return knowledge from this domain (None for all).
+        :param limit: Maximum number of results.
+        :return: List of row dictionaries with an added "score" (higher is better), best first.
+        """
+        if not self.full_text:
+            raise ValueError(f"Full-text search is not enabled for {self.db_path}; open it with full_text=True.")
+        terms = dict.fromkeys(SEARCH_TERM_PATTERN.findall(str(text).lower()))
+        if not terms:
+            return []
+        query = " OR ".join(f'"{term}"' for term in terms)
+        columns = ", ".join(f"knowledge.{column}" for column in KNOWLEDGE_COLUMNS)
+        domain_filter, parameters = ("AND knowledge.domain = ?", [domain]) if domain is not None else ("", [])
+        rows = self.conn.execute(f"""
+            SELECT {columns}, bm25(knowledge_fts) AS rank FROM knowledge_fts
+            JOIN knowledge ON knowledge.id = knowledge_fts.rowid
+            WHERE knowledge_fts MATCH ? {domain_filter}
+            ORDER BY rank LIMIT ?
+        """, [query] + parameters + [limit]).fetchall()
+        return [{**self._row_to_dict(row[:-1]), "score": -row[-1]} for row in rows]
+
+    def similar(self, query_text, k=5, domain=None):
+        """
+        Find stored knowledge whose input is similar to a query (approximate, sublinear in the table size).
+        :param query_text: Text query.
+        :param k: Maximum number of results.
+        :param domain: Only return knowledge from this domain (None for all).
+        :return: List of dictionaries with "id", "input", "output", "domain" and "similarity", best first.
+        """
+        matches = self.input_index.query(self.input_encoder.encode(str(query_text)), k, domain)
+        if not matches:
+            return []
+        placeholders = ", ".join("?" * len(matches))
+        rows = {row[0]: row for row in self.conn.execute(
+            f"SELECT id, input, output, domain FROM knowledge WHERE id IN ({placeholders})",
+            [match["id"] for match in matches])}
+        return [{"id": match["id"], "input": rows[match["id"]][1], "output": rows[match["id"]][2],
+                 "domain": rows[match["id"]][3], "similarity": match["similarity"]}
+                for match in matches if match["id"] in rows]
+
+    def _retention_scopes(self):
+        """Yield the SQL condition, its parameters and the policy of every retention policy."""
+        named = [domain for domain in self.retention if domain != DEFAULT_RETENTION]
+        for domain, policy in self.retention.items():
+            if domain != DEFAULT_RETENTION:
+                yield "domain = ?", [domain], policy
+            elif named:
+                yield f"(domain IS NULL OR domain NOT IN ({', '.join('?' * len(named))}))", named, policy
+            else:
+                yield "1", [], policy
+
+    def _expired_ids(self, condition, parameters, policy, limit):
+        """Ids of up to limit rows in a retention scope that its policy evicts."""
+        ids = []
+        ttl = policy.get("ttl")
+        if ttl is not None:
+            seconds = ttl.total_seconds() if isinstance(ttl, timedelta) else ttl
+            ids += [row[0] for row in self.conn.execute(
+                f"SELECT id FROM knowledge WHERE {condition} AND last_seen < datetime('now', ?) LIMIT ?",
+                parameters + [f"-{seconds} seconds", limit])]
+        max_rows = policy.get("max_rows")
+        if max_rows is not None and len(ids) < limit:
+            # Least recently seen rows beyond the first max_rows
+            ids += [row[0] for row in self.conn.execute(
+                f"SELECT id FROM knowledge WHERE {condition} ORDER BY last_seen DESC, id DESC LIMIT ? OFFSET ?",
+                parameters + [limit - len(ids), max_rows])]
+        return list(dict.fromkeys(ids))
+
+    def _evict_batch(self, condition, parameters, policy, limit):
+        """
+        Delete one batch of expired rows in a short transaction and subtract them from the trace,
+        the cleanup memory and the input index.
+        :return: Number of rows evicted.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")  # Rows cannot be seen again between selection and deletion
+            row_ids = self._expired_ids(condition, parameters, policy, limit)
+            if not row_ids:
+                return 0
+            placeholders = ", ".join("?" * len(row_ids))
+            rows = self.conn.execute(f"SELECT id, output, input_embedding, output_embedding, input FROM knowledge "
+                                     f"WHERE id IN ({placeholders})", row_ids).fetchall()
+            self.conn.execute(f"DELETE FROM knowledge WHERE id IN ({placeholders})", row_ids)
+
+        # The trace holds each fact once (see content_hash), so subtracting its pair undoes it. Only rows
+        # the cleanup memory records (it is discarded when saved for another table generation) are known
+        # to be in the trace; subtracting any other pair would corrupt it. On the binary backend the
+        # subtraction is exact unless vote counters saturated (see BinaryHolographicMemory.forget_many).
+        encoded = set(self.item_memory.row_ids.tolist())
+        rows = [row for row in rows if row[0] in encoded]
+        if rows:
+            keys = [encoded_vector(row[4], row[2]) for row in rows]
+            values = [encoded_vector(row[1], row[3]) for row in rows]
+            self.holographic_memory.forget_many(np.array(keys), np.array(values))
+        self.item_memory.remove_many(row_ids)
+        self.input_index.remove_many(row_ids)
+        return len(row_ids)
+
+    def apply_retention(self, batch_size=None):
+        """
+        Evict the rows the retention policies expire, one small transaction at a time so writers are
+        never blocked for long, then return the freed pages to the file system incrementally.
+        :param batch_size: Rows deleted per transaction (defaults to retention_batch_size).
+        :return: Number of rows evicted.
+        """
+        batch_size = batch_size or self.retention_batch_size
+        evicted = 0
+        for condition, parameters, policy in self._retention_scopes():
+            while not self._retention_stop.is_set():
+                count = self._evict_batch(condition, parameters, policy, batch_size)
+                if count == 0:
+                    break
+                evicted += count
+        if evicted:
+            logging.info(f"[Retention] Evicted {evicted} rows from {self.db_path}.")
+            self.incremental_vacuum()
+        return evicted
+
+    def incremental_vacuum(self, pages=None):
+        """
+        Return free pages of the database file to the file system without rewriting the database.
+        Only databases created with auto_vacuum = INCREMENTAL (the default profile) support it.
+        :param pages: Maximum number of pages to free (None frees all).
+        :return: Number of pages freed.
+        """
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logging.debug(f"[Retention] {self.db_path} was not created with incremental auto-vacuum.")
+            return 0
+        free_pages = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        self.conn.execute(f"PRAGMA incremental_vacuum({int(pages) if pages else 0})").fetchall()
+        return free_pages - self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def _run_retention(self, interval):
+        """Background loop of apply_retention() (runs on its own pooled connection)."""
+        while not self._retention_stop.wait(interval):
+            try:
+                self.apply_retention()
+            except Exception as e:
+                logging.error(f"[Retention] Failed to apply retention to {self.db_path}: {e}")
+        self._pool.release()
+
+    def flush(self, timeout=None):
+        """
+        Save pending holographic, cleanup-memory and index changes; with write_behind, first wait
+        until every queued write is committed (a durability barrier).
+        :param timeout: Seconds to wait for queued writes (None waits forever).
+        :return: True once every write accepted before the call is committed, False if the wait timed out.
+        Raises RuntimeError if a queued write failed to commit.
+        """
+        reached = True
+        if self._writes is not None:
+            reached = self._writes.flush(timeout)
+        _flush_sidecars(self.holographic_memory, self.item_memory, self.input_index)
+        return reached
+
     def close(self):
         """
         Close the database connection and perform any necessary cleanup.
         """
-        if self.conn:
-            self.conn.close()
-            logging.info(f"Database connection closed for {self.db_path}.")
+        if self._retention_thread is not None:
+            self._retention_stop.set()
+            self._retention_thread.join()
+            self._retention_thread = None
+        writes, self._writes = self._writes, None
+        try:
+            if writes is not None:
+                writes.close()  # Persist everything still queued (raises if a queued write failed)
+        finally:
+            self._pool.close_all()
+            logging.info(f"Database connections closed for {self.db_path}.")
+            _flush_sidecars(self.holographic_memory, self.item_memory, self.input_index)
+            if self.holographic_memory:
+                release_memory(self.holographic_memory)
+                self.holographic_memory = None
 
     @staticmethod
     def _text_to_vector(text, dimensions=1024):
         """
-        Convert text into a high-dimensional vector.
+        Convert text into a high-dimensional vector (the same vector in every process).
         """
-        if isinstance(text, (list, dict)):
-            # Convert list or dictionary to a string representation
-            text = json.dumps(text)  # Convert to JSON string
-        elif not isinstance(text, str):
-            # Convert other types to string
-            text = str(text)
-        np.random.seed(hash(text) % (2**32))  # Consistent hash for text
-        return np.random.randn(dimensions)
+        return encode_text(text, dimensions)
 
     @staticmethod
     def _vector_to_text(vector):
         """
         Convert a vector back to a textual representation.
         """
-        return f"Vector[{len(vector)} dimensions]: {np.round(vector[:5], 3)}..."
\ No newline at end of file
+        return f"Vector[{len(vector)} dimensions]: {np.round(vector[:5], 3)}..."
+
+
+class MemoryStoreManager:
+    def __init__(self):
+        """
+        Hand out one shared MemoryStore per database file, so entities opening the same database
+        share its connections, trace, cleanup memory and input index.
+        """
+        self._entries = {}  # absolute db path -> [store, reference count, creation options]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _conflicting_options(created_with, options):
+        """
+        Names of the requested options that differ from the ones an existing store was opened with.
+        :param created_with: Options the shared store was created with (omitted ones took MemoryStore's defaults).
+        :param options: Options of the current request.
+        :return: Sorted list of conflicting option names.
+        """
+        defaults = {name: parameter.default for name, parameter in inspect.signature(MemoryStore).parameters.items()}
+        return sorted(name for name, value in options.items()
+                      if name not in defaults or created_with.get(name, defaults[name]) != value)
+
+    def acquire(self, db_path, **options):
+        """
+        Return the shared store for a database, opening it on first use.
+        Later requests may omit options, but may not ask for different ones than the store was opened with.
+        :param db_path: Path of the SQLite database.
+        :param options: Extra MemoryStore arguments, used when the store is created.
+        :return: Shared MemoryStore instance.
+        :raises ValueError: If the store is already open with different options.
+        """
+        key = os.path.abspath(db_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [MemoryStore(db_path, **options), 0, options]
+            else:
+                conflicts = self._conflicting_options(entry[2], options)
+                if conflicts:
+                    raise ValueError(f"{db_path} is already open with different options {conflicts}; "
+                                     f"release it before reopening.")
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, store):
+        """
+        Drop one reference to a shared store; the last release closes it.
+        :param store: Store returned by acquire().
+        """
+        key = os.path.abspath(store.db_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not store:
+                store.close()  # Not shared through the manager
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._entries[key]
+        store.close()
+
+    def flush_all(self):
+        """
+        Flush every shared store.
+        """
+        with self._lock:
+            stores = [entry[0] for entry in self._entries.values()]
+        for store in stores:
+            store.flush()
+
+    def close_all(self):
+        """
+        Close every shared store, regardless of outstanding references.
+        """
+        with self._lock:
+            stores = [entry[0] for entry in self._entries.values()]
+            self._entries.clear()
+        for store in stores:
+            store.close()
+
+
+# Process-wide manager; registered after the memory registry, so stores close before the shared traces
+store_manager = MemoryStoreManager()
+atexit.register(store_manager.close_all)
+
+
+def acquire_store(db_path, **options):
+    """Return the process-wide shared MemoryStore for a database (see MemoryStoreManager.acquire)."""
+    return store_manager.acquire(db_path, **options)
+
+
+def release_store(store):
+    """Release a store obtained from acquire_store()."""
+    store_manager.release(store)
@@ -1,12 +1,12 @@
 # domains/programming_module.py
 
 import numpy as np
-from core.holographic_memory import HolographicMemory
+from core.memory_registry import acquire_memory
 
 class ProgrammingModule:
-    def __init__(self, learning_engine, memory_dimensions=16384, memory_store=None):
+    def __init__(self, learning_engine, memory_dimensions=16384, memory_store=None, memory_backend="holographic"):
         self.engine = learning_engine
-        self.memory = HolographicMemory(dimensions=memory_dimensions)
+        self.memory = acquire_memory(dimensions=memory_dimensions, backend=memory_backend)
         self.memory_store = memory_store
 
     def store_code_snippet(self, code_snippet, description):
@@ -0,0 +1,146 @@
+# rebuild_traces.py
+
+import os
+import argparse
+import logging
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from core.holographic_memory import HolographicMemory
+from core.item_memory import ItemMemory
+from core.memory_registry import DEFAULT_MEMORY_FILES
+from memory_store import default_trace_file, embedding_to_blob, encoded_vector
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Per-process memory used only to compute bindings (never saved)
+_worker_memory = None
+
+
+def _init_worker(options):
+    """Create the binding-only HolographicMemory of a pool process."""
+    global _worker_memory
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_memory = HolographicMemory(memory_file=f"{options.pop('memory_file')}.worker{os.getpid()}",
+                                       autosave_every=None, **options)
+
+
+def _bind_chunk(keys, values):
+    """Summed weighted bindings of one chunk of embeddings (runs in a pool process)."""
+    return _worker_memory.weighted_bindings(keys, values)[0]
+
+
+def _decode_rows(rows):
+    """
+    Turn database rows into the key/value vectors MemoryStore encodes them with (see encoded_vector),
+    so the rebuilt trace matches the live one and later evictions still subtract exactly.
+    :return: Tuple of (keys, values, backfill) where backfill lists (input BLOB, output BLOB, id) updates
+             for rows that have no stored BLOBs.
+    """
+    keys, values, backfill = [], [], []
+    for row_id, input_text, output_text, input_blob, output_blob in rows:
+        key, value = encoded_vector(input_text, input_blob), encoded_vector(output_text, output_blob)
+        if input_blob is None or output_blob is None:
+            backfill.append((embedding_to_blob(key), embedding_to_blob(value), row_id))
+        keys.append(key)
+        values.append(value)
+    return np.array(keys), np.array(values), backfill
+
+
+def rebuild_traces(db_paths, memory_file, dimensions=16384, dtype="complex128", spectrum="full",
+                   regularisation=0.01, chunk_size=2048, workers=None, rebuild_items=True):
+    """
+    Rebuild a holographic trace (and the cleanup item memories) from the knowledge tables of every
+    database that stores into it. Rows are streamed in chunks, re-encoded with batched FFTs across a
+    process pool and summed into a fresh trace that replaces memory_file atomically. Rows without
+    embedding BLOBs get them backfilled.
+    The process-wide default trace is refused: NormalEntities and domain modules superpose pairs into
+    it that no database holds, so rebuilding it would silently drop them.
+    :param db_paths: Path (or list of paths) of every MemoryStore database sharing memory_file.
+    :param memory_file: Trace file to (re)write.
+    :param dimensions: Dimensions of the new trace (may differ from the old one).
+    :param dtype: Precision tier of the new trace.
+    :param spectrum: Spectrum layout of the new trace ("full" or "real").
+    :param regularisation: Initial regularization used by MemoryStore when encoding.
+    :param chunk_size: Rows per chunk sent to a worker.
+    :param workers: Worker processes (None uses every core).
+    :param rebuild_items: Also rewrite "<db stem>_items.npz" of every database from its stored outputs.
+    :return: Number of rows encoded.
+    """
+    if os.path.abspath(memory_file) == os.path.abspath(DEFAULT_MEMORY_FILES["holographic"]):
+        raise ValueError(f"{memory_file} is the shared default trace, which also holds pairs stored outside "
+                         f"any database; rebuild only traces dedicated to the given databases.")
+    db_paths = [db_paths] if isinstance(db_paths, str) else list(db_paths)
+    tmp_file = memory_file + ".rebuild"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    trace = HolographicMemory(dimensions=dimensions, memory_file=tmp_file, dtype=dtype, spectrum=spectrum,
+                              initial_regularization=regularisation, autosave_every=None)
+    options = dict(memory_file=tmp_file, dimensions=dimensions, spectrum=spectrum,
+                   initial_regularization=regularisation)
+    workers = workers or os.cpu_count()
+    spectrum_sum = np.zeros(trace.spectrum_size, dtype=complex)
+    total = 0
+    rebuilt_items = []  # (rebuilt ItemMemory, file it replaces)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+        pending = []
+        max_pending = 2 * workers  # Bound the rows held in memory
+        for db_path in db_paths:
+            items = None
+            if rebuild_items:
+                items_file = f"{os.path.splitext(db_path)[0]}_items.npz"
+                if os.path.exists(items_file + ".rebuild"):
+                    os.remove(items_file + ".rebuild")
+                items = ItemMemory(memory_file=items_file + ".rebuild")
+                rebuilt_items.append((items, items_file))
+            conn = sqlite3.connect(db_path)
+            cursor = conn.execute("SELECT id, input, output, input_embedding, output_embedding FROM knowledge ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if rows:
+                    keys, values, backfill = _decode_rows(rows)
+                    pending.append(pool.submit(_bind_chunk, keys, values))
+                    if items is not None:
+                        items.add_many(values, [row[0] for row in rows], [row[2] for row in rows])
+                    if backfill:
+                        with conn:
+                            conn.executemany("UPDATE knowledge SET input_embedding = ?, output_embedding = ? "
+                                             "WHERE id = ?", backfill)
+                    total += len(rows)
+                while pending and len(pending) >= max_pending:
+                    spectrum_sum += pending.pop(0).result()
+                if not rows:
+                    break
+                logging.info(f"[RebuildTraces] Submitted {total} rows.")
+            conn.close()
+        while pending:
+            spectrum_sum += pending.pop(0).result()
+
+    trace.memory_space = spectrum_sum
+    trace.save_memory()
+    os.replace(tmp_file, memory_file)
+    for items, items_file in rebuilt_items:
+        items.save()
+        os.replace(items.memory_file, items_file)
+    logging.info(f"[RebuildTraces] Rebuilt {memory_file} ({dimensions} dimensions) from {total} rows of "
+                 f"{', '.join(db_paths)}.")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild a holographic trace from the knowledge databases sharing it.")
+    parser.add_argument("db_paths", nargs="+", help="Every database that stores into the trace.")
+    parser.add_argument("--memory-file", default=None,
+                        help="Trace to rebuild (defaults to the trace of the only database given).")
+    parser.add_argument("--dimensions", type=int, default=16384)
+    parser.add_argument("--dtype", default="complex128")
+    parser.add_argument("--spectrum", default="full")
+    parser.add_argument("--chunk-size", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if args.memory_file is None and len(args.db_paths) > 1:
+        parser.error("--memory-file is required when several databases share a trace.")
+    rebuild_traces(args.db_paths, memory_file=args.memory_file or default_trace_file(args.db_paths[0]), dimensions=args.dimensions, dtype=args.dtype,
+                   spectrum=args.spectrum, chunk_size=args.chunk_size, workers=args.workers)
@@ -1,8 +1,10 @@
 # reset_system.py
 
 import os
+import glob
 import sqlite3
 import numpy as np
+from memory_store import MemoryStore, default_trace_file
 
 # List of database files to reset
 DATABASE_FILES = [
@@ -25,9 +27,27 @@ HOLOGRAPHIC_MEMORY_FILES = [
     "data/NormalEntity2_holographic_memory.npy",
 ]
 
+# Files saved beside the databases and traces that describe their contents: entity cleanup memories,
+# the cleanup memories and input indexes of MemoryStore databases, and delta logs of traces
+SIDECAR_PATTERNS = [
+    "data/*_items.npz",
+    "data/*_index.npz",
+    "data/*.npy.log",
+]
+
+def remove_file(file_path):
+    """
+    Delete a file if it exists.
+    :param file_path: Path of the file.
+    """
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        print(f"Removed: {file_path}")
+
 def reset_database(db_path):
     """
-    Reset a database by dropping all tables and recreating the necessary structure.
+    Reset a database by dropping all tables and recreating the structure MemoryStore uses.
+    The database's own trace, cleanup memory and input index are removed with its rows.
     :param db_path: Path to the database file.
     """
     try:
@@ -35,30 +55,32 @@ def reset_database(db_path):
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
-        # Drop all tables (if they exist)
+        # Keep the full-text index of databases that had one
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'knowledge_fts';")
+        full_text = cursor.fetchone() is not None
+
+        # Drop all tables (if they exist); dropping a virtual table also drops its shadow tables
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = cursor.fetchall()
         for table in tables:
             cursor.execute(f"DROP TABLE IF EXISTS {table[0]};")
             print(f"Dropped table: {table[0]} in {db_path}")
 
-        # Recreate the necessary table structure
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS knowledge (
-                id INTEGER PRIMARY KEY,
-                input TEXT,
-                output TEXT,
-                domain TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        print(f"Recreated table 'knowledge' in {db_path}")
-
         # Commit changes and close the connection
         conn.commit()
         conn.close()
     except sqlite3.Error as e:
         print(f"Error resetting database {db_path}: {e}")
+        return
+
+    stem = os.path.splitext(db_path)[0]
+    for file_path in (default_trace_file(db_path), default_trace_file(db_path) + ".log",
+                      default_trace_file(db_path, "binary"), f"{stem}_items.npz", f"{stem}_index.npz"):
+        remove_file(file_path)
+
+    # Recreate the table structure (columns, indexes and a new generation id) through MemoryStore
+    MemoryStore(db_path, full_text=full_text).close()
+    print(f"Recreated table 'knowledge' in {db_path}")
 
 def reset_holographic_memory(file_path):
     """
@@ -88,6 +110,13 @@ def reset_system():
     for memory_file in HOLOGRAPHIC_MEMORY_FILES:
         reset_holographic_memory(memory_file)
 
+    # Remove what still describes the old contents (row ids restart at 1 after the reset)
+    print("\nRemoving cleanup memories, indexes and delta logs...")
+    remove_file("data/binary_memory.npz")
+    for pattern in SIDECAR_PATTERNS:
+        for file_path in glob.glob(pattern):
+            remove_file(file_path)
+
     print("\nSystem reset complete. All data has been cleared.")
 
 if __name__ == "__main__":
@@ -5,9 +5,14 @@ from scipy.ndimage import gaussian_filter1d
 from scipy.signal import medfilt
 from sklearn.metrics import mean_squared_error
 #import psutil
+import os
+import tempfile
 import time
 import logging
 
+from core.holographic_memory import HolographicMemory as PersistentHolographicMemory, MEMORY_DTYPES, RETRIEVAL_MODES
+from core.item_memory import ItemMemory
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -115,6 +120,30 @@ class HolographicMemory:
 #
 
 
+def generate_pairs(dimensions, num_pairs):
+    """
+    Generate orthogonal keys and random values for the MSE harness.
+    :return: Tuple of (keys, values), one pair per row.
+    """
+    keys = np.random.randn(dimensions, num_pairs)
+    Q, _ = qr(keys, mode='economic')
+    keys = Q.T
+    values = [np.random.randn(dimensions) for _ in range(num_pairs)]
+    return keys, values
+
+
+def measure_average_mse(memory, keys, values):
+    """
+    Retrieve every key from memory and average the MSE against the stored values.
+    """
+    mse_list = []
+    for i in range(len(keys)):
+        retrieved_value = memory.retrieve(keys[i])
+        mse = mean_squared_error(values[i], retrieved_value)
+        mse_list.append(mse)
+    return np.mean(mse_list)
+
+
 def test_scaled_holographic_memory():
     dimensions = 16384  # Increased dimensions for high accuracy
     num_pairs = 100  # Number of key-value pairs
@@ -124,10 +153,7 @@ def test_scaled_holographic_memory():
     start_time = time.time()
 
     # Generate orthogonal keys and random values
-    keys = np.random.randn(dimensions, num_pairs)
-    Q, _ = qr(keys, mode='economic')
-    keys = Q.T
-    values = [np.random.randn(dimensions) for _ in range(num_pairs)]
+    keys, values = generate_pairs(dimensions, num_pairs)
 
     # Encode key-value pairs with dynamic iterations
     for i in range(num_pairs):
@@ -137,15 +163,9 @@ def test_scaled_holographic_memory():
     logging.info(f"[Performance] Encoding completed in {encoding_time:.2f} seconds.")
 
     logging.info("[Test] Retrieval and Accuracy Testing...")
-    mse_list = []
 
     # Retrieve and calculate accuracy
-    for i in range(num_pairs):
-        retrieved_value = memory.retrieve(keys[i])
-        mse = mean_squared_error(values[i], retrieved_value)
-        mse_list.append(mse)
-
-    average_mse = np.mean(mse_list)
+    average_mse = measure_average_mse(memory, keys, values)
     logging.info(f"\n[Results] Average MSE across {num_pairs} key-value pairs: {average_mse:.5f}")
 
     # Check if MSE is below the desired threshold
@@ -158,19 +178,76 @@ def test_scaled_holographic_memory():
     logging.info("\n[Compression Test] Applying compression to memory...")
     memory.compress_memory()
 
-    mse_list_compressed = []
-
     # Retrieve and calculate accuracy after compression
-    for i in range(num_pairs):
-        retrieved_value_compressed = memory.retrieve(keys[i])
-        mse_compressed = mean_squared_error(values[i], retrieved_value_compressed)
-        mse_list_compressed.append(mse_compressed)
-
-    average_mse_compressed = np.mean(mse_list_compressed)
+    average_mse_compressed = measure_average_mse(memory, keys, values)
     logging.info(f"[Results] Average MSE after compression: {average_mse_compressed:.5f}")
 
     retrieval_time = time.time() - start_time
     logging.info(f"[Performance] Total execution time: {retrieval_time:.2f} seconds.")
 
+
+def precision_tier_report(dimensions=16384, num_pairs=100):
+    """
+    Compare the precision tiers of the persistent HolographicMemory with the MSE harness.
+    :return: Dictionary mapping dtype to (average MSE, bytes held by the trace).
+    """
+    keys, values = generate_pairs(dimensions, num_pairs)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for dtype in MEMORY_DTYPES:
+            memory = PersistentHolographicMemory(dimensions=dimensions, dtype=dtype, autosave_every=None,
+                                                 memory_file=os.path.join(tmpdir, f"{dtype}.npy"))
+            for i in range(num_pairs):
+                memory.dynamic_encode(keys[i], values[i])
+            report[dtype] = (measure_average_mse(memory, keys, values), memory.nbytes)
+
+    baseline_bytes = report["complex128"][1]
+    logging.info(f"[Precision Report] {num_pairs} pairs at {dimensions} dimensions")
+    for dtype, (mse, nbytes) in report.items():
+        logging.info(f"[Precision Report] {dtype:>10}: MSE {mse:.5f}, {nbytes} bytes "
+                     f"({baseline_bytes / nbytes:.1f}x smaller)")
+    return report
+
+
+def capacity_report(dimensions=(1024, 2048, 4096, 8192, 16384), num_pairs=(16, 64, 256),
+                    modes=RETRIEVAL_MODES, min_recall=0.95):
+    """
+    Measure cleanup recall (share of keys whose retrieval matches its own stored value best)
+    for every retrieval mode, dimension and number of stored pairs.
+    :param min_recall: Recall counted as acceptable when picking the smallest usable dimension.
+    :return: Dictionary mapping (mode, dimensions, pairs) to recall.
+    """
+    rng = np.random.default_rng(0)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for dims in dimensions:
+            for pairs in num_pairs:
+                keys = rng.standard_normal((pairs, dims))
+                values = rng.standard_normal((pairs, dims))
+                memory = PersistentHolographicMemory(dimensions=dims, autosave_every=None,
+                                                     memory_file=os.path.join(tmpdir, f"{dims}_{pairs}.npy"))
+                memory.encode_many(keys, values, 0.0)
+                items = ItemMemory(dimensions=dims)
+                items.add_many(values, range(pairs), range(pairs))
+                for mode in modes:
+                    retrieved = memory.retrieve_many(keys, denoise="none", retrieval=mode)
+                    matches = items.match_many(retrieved)
+                    report[(mode, dims, pairs)] = np.mean([match[0]["id"] == row for row, match in enumerate(matches)])
+
+    logging.info(f"[Capacity Report] Cleanup recall by dimensions (rows) and stored pairs (columns)")
+    for mode in modes:
+        logging.info(f"[Capacity Report] {mode}: pairs {list(num_pairs)}")
+        for dims in dimensions:
+            recalls = " ".join(f"{report[(mode, dims, pairs)]:.2f}" for pairs in num_pairs)
+            logging.info(f"[Capacity Report] {mode:>11} {dims:>6}: {recalls}")
+        for pairs in num_pairs:
+            usable = [dims for dims in dimensions if report[(mode, dims, pairs)] >= min_recall]
+            smallest = usable[0] if usable else "none"
+            logging.info(f"[Capacity Report] {mode:>11}: smallest dimension with recall >= {min_recall} "
+                         f"for {pairs} pairs: {smallest}")
+    return report
+
 if __name__ == "__main__":
     test_scaled_holographic_memory()
+    precision_tier_report()
+    capacity_report()
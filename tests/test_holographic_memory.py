@@ -0,0 +1,344 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import core.binary_memory
+from core.binary_memory import BinaryHolographicMemory, hamming_similarity, pack, to_bits
+from core.holographic_memory import HolographicMemory
+from core.memory_registry import HolographicMemoryRegistry
+from core.sharded_memory import ShardedHolographicMemory
+
+
+class TestHolographicMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.memory_file = os.path.join(self.tmpdir.name, "memory.npy")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_memory(self, **kwargs):
+        kwargs.setdefault("dimensions", 1024)
+        return HolographicMemory(memory_file=self.memory_file, **kwargs)
+
+    def test_encode_many_matches_encode(self):
+        keys = self.rng.standard_normal((8, 256))
+        values = self.rng.standard_normal((8, 256))
+        single = self.make_memory()
+        for key, value in zip(keys, values):
+            single.encode(key, value, 0.01)
+        batched = self.make_memory()
+        batched.encode_many(keys, values, 0.01)
+        np.testing.assert_allclose(batched.memory_space, single.memory_space, atol=1e-10)
+
+    def test_retrieve_many_matches_retrieve(self):
+        keys = self.rng.standard_normal((4, 256))
+        values = self.rng.standard_normal((4, 256))
+        memory = self.make_memory()
+        memory.encode_many(keys, values, 0.0)
+        batched = memory.retrieve_many(keys)
+        for i, key in enumerate(keys):
+            np.testing.assert_allclose(batched[i], memory.retrieve(key), atol=1e-10)
+
+    def test_fft_backends_agree_with_worker_threads(self):
+        keys = self.rng.standard_normal((6, 256))
+        values = self.rng.standard_normal((6, 256))
+        reference = self.make_memory()
+        reference.encode_many(keys, values, 0.01)
+        for backend in ("scipy", "pocketfft", "numpy"):
+            with self.subTest(backend=backend):
+                memory = self.make_memory(fft_backend=backend, fft_workers=2)
+                memory.encode_many(keys, values, 0.01)
+                np.testing.assert_allclose(memory.memory_space, reference.memory_space, atol=1e-10)
+                np.testing.assert_allclose(memory.retrieve_many(keys), reference.retrieve_many(keys), atol=1e-10)
+        with self.assertRaises(ValueError):
+            self.make_memory(fft_backend="cufft")
+
+    def test_closed_form_dynamic_encode_matches_iterative(self):
+        key = self.rng.standard_normal(256)
+        value = self.rng.standard_normal(256)
+        closed = self.make_memory(autosave_every=None)
+        closed.dynamic_encode(key, value)
+        iterative = self.make_memory(autosave_every=None)
+        iterative.dynamic_encode(key, value, iterative=True)
+        np.testing.assert_allclose(closed.memory_space, iterative.memory_space, atol=1e-10)
+
+    def test_dynamic_encode_many_matches_dynamic_encode(self):
+        keys = self.rng.standard_normal((5, 256))
+        values = self.rng.standard_normal((5, 256))
+        single = self.make_memory(autosave_every=None)
+        for key, value in zip(keys, values):
+            single.dynamic_encode(key, value)
+        batched = self.make_memory(autosave_every=None)
+        batched.dynamic_encode_many(keys, values)
+        np.testing.assert_allclose(batched.memory_space, single.memory_space, atol=1e-10)
+
+    def test_autosave_policy_defers_writes_until_flush(self):
+        memory = self.make_memory(autosave_every=3)
+        for _ in range(2):
+            memory.dynamic_encode(self.rng.standard_normal(64), self.rng.standard_normal(64))
+        self.assertFalse(os.path.exists(self.memory_file))
+        memory.flush()
+        np.testing.assert_allclose(np.load(self.memory_file), memory.memory_space)
+
+    def test_autosave_interval_is_checked_on_retrieval(self):
+        memory = self.make_memory(autosave_every=None, autosave_interval=60)
+        key, value = self.rng.standard_normal(64), self.rng.standard_normal(64)
+        with mock.patch("core.holographic_memory.time.monotonic", return_value=memory._last_save + 1):
+            memory.dynamic_encode(key, value)
+            memory.retrieve(key)
+        self.assertFalse(os.path.exists(self.memory_file))
+        with mock.patch("core.holographic_memory.time.monotonic", return_value=memory._last_save + 61):
+            memory.retrieve(key)  # No further writes, but the interval has passed
+        np.testing.assert_allclose(np.load(self.memory_file), memory.memory_space)
+
+    def test_real_spectrum_matches_full_spectrum(self):
+        keys = self.rng.standard_normal((4, 256))
+        values = self.rng.standard_normal((4, 256))
+        full = self.make_memory(autosave_every=None)
+        real = HolographicMemory(dimensions=1024, memory_file=self.memory_file, spectrum="real", autosave_every=None)
+        full.encode_many(keys, values, 0.0)
+        real.encode_many(keys, values, 0.0)
+        self.assertEqual(real.memory_space.shape, (513,))
+        np.testing.assert_allclose(real.retrieve_many(keys), full.retrieve_many(keys), atol=1e-8)
+
+    def test_full_spectrum_file_converts_to_real(self):
+        full = self.make_memory()
+        full.dynamic_encode(self.rng.standard_normal(256), self.rng.standard_normal(256))
+        real = self.make_memory(spectrum="real")
+        np.testing.assert_allclose(real.memory_space, full.memory_space[:513])
+        real.save_memory()
+        reloaded = self.make_memory()
+        np.testing.assert_allclose(reloaded.memory_space, full.memory_space, atol=1e-12)
+
+    def test_int8_tier_round_trips_through_disk(self):
+        keys = self.rng.standard_normal((4, 256))
+        values = self.rng.standard_normal((4, 256))
+        reference = HolographicMemory(dimensions=1024, memory_file=self.memory_file + ".ref.npy", autosave_every=None)
+        reference.encode_many(keys, values, 0.0)
+        quantized = self.make_memory(dtype="int8")
+        quantized.encode_many(keys, values, 0.0)
+        quantized.save_memory()
+        self.assertLess(quantized._space.nbytes, reference.nbytes / 7)
+        self.assertLess(quantized.nbytes, reference.nbytes / 3.5)  # Trace plus its rounding residual
+        reloaded = self.make_memory()
+        np.testing.assert_allclose(reloaded.memory_space, reference.memory_space, atol=0.05)
+        np.testing.assert_array_equal(reloaded.memory_space, quantized.memory_space)  # RAM holds the int8 trace
+
+    def test_int8_tier_keeps_incremental_writes_accurate(self):
+        reference = HolographicMemory(dimensions=1024, memory_file=self.memory_file + ".ref.npy", autosave_every=None)
+        quantized = self.make_memory(dtype="int8")
+        mapped = HolographicMemory(dimensions=1024, memory_file=self.memory_file + ".map.npy", autosave_every=None,
+                                   dtype="int8", mmap=True)
+        for _ in range(300):
+            key, value = self.rng.standard_normal(256), self.rng.standard_normal(256)
+            for memory in (reference, quantized, mapped):
+                memory.dynamic_encode(key, value)
+        quantized.save_memory()
+        mapped.close()
+        for memory_file in (self.memory_file, self.memory_file + ".map.npy"):
+            reloaded = HolographicMemory(dimensions=1024, memory_file=memory_file, autosave_every=None)
+            error = np.linalg.norm(reloaded.memory_space - reference.memory_space)
+            self.assertLess(error / np.linalg.norm(reference.memory_space), 0.02)
+
+    def test_mmap_instances_share_one_trace(self):
+        writer = self.make_memory(mmap=True)
+        reader = self.make_memory(mmap=True)
+        writer.encode(self.rng.standard_normal(256), self.rng.standard_normal(256), 0.0)
+        np.testing.assert_allclose(reader.memory_space, writer.memory_space)
+        writer.close()
+        reader.close()
+
+    def test_delta_log_replays_after_restart_and_compacts(self):
+        pairs = [(self.rng.standard_normal(64), self.rng.standard_normal(64)) for _ in range(5)]
+        reference = HolographicMemory(dimensions=1024, memory_file=self.memory_file + ".ref.npy", autosave_every=None)
+        logged = self.make_memory(persistence="log", compact_every=3)
+        for key, value in pairs:
+            reference.dynamic_encode(key, value)
+            logged.dynamic_encode(key, value)
+        self.assertEqual(logged._delta_log.count, 2)  # Compacted once after three encodes
+        logged._delta_log.close()  # Simulate a crash: no final save
+        restarted = self.make_memory(persistence="log")
+        np.testing.assert_allclose(restarted.memory_space, reference.memory_space, atol=1e-12)
+        restarted.close()
+
+    def test_compress_memory_keeps_sparse_trace_on_disk(self):
+        keys = self.rng.standard_normal((8, 256))
+        values = self.rng.standard_normal((8, 256))
+        memory = self.make_memory()
+        memory.encode_many(keys, values, 0.0)
+        ratio = memory.compress_memory()
+        self.assertLess(ratio, 0.35)
+        self.assertAlmostEqual(np.count_nonzero(memory.memory_space) / 1024, 0.25, places=2)
+        reloaded = self.make_memory()
+        self.assertIsNotNone(reloaded._sparse)
+        np.testing.assert_allclose(reloaded.retrieve_many(keys), memory.retrieve_many(keys))
+
+    def test_spectral_denoise_matches_spatial_filters_away_from_edges(self):
+        keys = self.rng.standard_normal((4, 256))
+        values = self.rng.standard_normal((4, 256))
+        memory = self.make_memory()
+        memory.encode_many(keys, values, 0.0)
+        spatial = memory.retrieve_many(keys, denoise="gaussian+median")
+        spectral = memory.retrieve_many(keys, denoise="spectral")
+        np.testing.assert_allclose(spectral[:, 20:-20], spatial[:, 20:-20], atol=1e-4)
+
+    def test_correlation_and_wiener_recall_more_pairs_than_inverse(self):
+        keys = self.rng.standard_normal((64, 1024))
+        values = self.rng.standard_normal((64, 1024))
+        memory = self.make_memory()
+        memory.encode_many(keys, values, 0.0)
+
+        def recall(mode):
+            retrieved = memory.normalize_many(memory.retrieve_many(keys, denoise="none", retrieval=mode))
+            scores = retrieved @ memory.normalize_many(values).T
+            return np.mean(np.argmax(scores, axis=1) == np.arange(len(keys)))
+
+        self.assertLess(recall("inverse"), 0.5)
+        self.assertGreater(recall("correlation"), 0.85)
+        self.assertGreater(recall("wiener"), 0.75)
+
+
+class TestHolographicMemoryRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.memory_file = os.path.join(self.tmpdir.name, "shared.npy")
+        self.registry = HolographicMemoryRegistry()
+
+    def tearDown(self):
+        self.registry.close_all()
+        self.tmpdir.cleanup()
+
+    def test_same_file_returns_shared_instance_and_last_release_flushes(self):
+        first = self.registry.acquire(memory_file=self.memory_file, dimensions=512)
+        second = self.registry.acquire(memory_file=self.memory_file, dimensions=512)
+        self.assertIs(first, second)
+        first.dynamic_encode(np.ones(16), np.ones(16))
+        self.registry.release(first)
+        self.assertFalse(os.path.exists(self.memory_file))
+        self.registry.release(second)
+        self.assertTrue(os.path.exists(self.memory_file))
+
+
+class TestShardedHolographicMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.memory_file = os.path.join(self.tmpdir.name, "sharded.npy")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_memory(self):
+        return ShardedHolographicMemory(num_shards=2, dimensions=1024, memory_file=self.memory_file,
+                                        max_load=8, autosave_every=None)
+
+    def test_splits_overloaded_shards_and_routes_after_reload(self):
+        keys = self.rng.standard_normal((64, 128))
+        values = self.rng.standard_normal((64, 128))
+        memory = self.make_memory()
+        for start in range(0, 64, 8):
+            memory.encode_many(keys[start:start + 8], values[start:start + 8], 0.0)
+        self.assertGreater(len(memory.shards), 2)
+        retrieved = memory.retrieve_many(keys)
+        np.testing.assert_allclose(retrieved[3], memory.retrieve(keys[3]))
+        memory.close()
+
+        reloaded = self.make_memory()
+        self.assertEqual(len(reloaded.shards), len(memory.shards))
+        np.testing.assert_allclose(reloaded.retrieve_many(keys), retrieved)
+        reloaded.close()
+
+    def test_autosave_persists_routing_with_the_shards(self):
+        keys = self.rng.standard_normal((12, 128))
+        values = self.rng.standard_normal((12, 128))
+        memory = ShardedHolographicMemory(num_shards=2, dimensions=1024, memory_file=self.memory_file, max_load=8)
+        for key, value in zip(keys, values):
+            memory.dynamic_encode(key, value)
+        retrieved = memory.retrieve_many(keys)
+        # Reopen without flush() or close(), as after a crash
+        reopened = self.make_memory()
+        self.assertEqual(reopened._key_index, memory._key_index)
+        np.testing.assert_allclose(reopened.retrieve_many(keys), retrieved)
+        memory.close()
+        reopened.close()
+
+
+class TestBinaryHolographicMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.memory_file = os.path.join(self.tmpdir.name, "binary.npz")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_recalls_values_and_reloads_votes(self):
+        keys = self.rng.standard_normal((32, 4096))
+        values = self.rng.standard_normal((32, 4096))
+        memory = BinaryHolographicMemory(dimensions=4096, memory_file=self.memory_file, autosave_every=None)
+        memory.encode_many(keys, values)
+        retrieved = memory.retrieve_many(keys)
+        scores = hamming_similarity(pack(to_bits(retrieved, 4096))[:, None], pack(to_bits(values, 4096))[None], 4096)
+        np.testing.assert_array_equal(np.argmax(scores, axis=1), np.arange(32))
+        self.assertEqual(memory.packed_trace.nbytes, 4096 // 8)
+
+        memory.save_memory()
+        reloaded = BinaryHolographicMemory(dimensions=4096, memory_file=self.memory_file)
+        np.testing.assert_array_equal(reloaded.retrieve(keys[0]), retrieved[0])
+
+    def test_forget_many_withdraws_votes(self):
+        keys = self.rng.standard_normal((8, 1024))
+        values = self.rng.standard_normal((8, 1024))
+        memory = BinaryHolographicMemory(dimensions=1024, memory_file=self.memory_file, autosave_every=None)
+        memory.dynamic_encode_many(keys, values)
+        memory.forget_many(keys[4:], values[4:])
+        expected = BinaryHolographicMemory(dimensions=1024, memory_file=self.memory_file + ".expected",
+                                           autosave_every=None)
+        expected.dynamic_encode_many(keys[:4], values[:4])
+        np.testing.assert_array_equal(memory.votes, expected.votes)
+        np.testing.assert_array_equal(memory.packed_trace, expected.packed_trace)
+
+    def test_votes_are_saturating_int16_counters(self):
+        key, value = np.ones((1, 64)), np.ones((1, 64))
+        with open(self.memory_file, "wb") as stored:  # Votes as saved by older versions
+            np.savez(stored, votes=np.full(64, -3, dtype=np.float32))
+        memory = BinaryHolographicMemory(dimensions=64, memory_file=self.memory_file, autosave_every=None)
+        self.assertEqual(memory.votes.dtype, np.int16)
+        memory.votes[:] = core.binary_memory.VOTE_LIMIT - 1
+        memory.encode_many(np.repeat(key, 3, axis=0), -np.repeat(value, 3, axis=0))
+        np.testing.assert_array_equal(memory.votes, core.binary_memory.VOTE_LIMIT)
+        memory.forget_many(key, value)  # Withdrawing a -1 vote
+        np.testing.assert_array_equal(memory.votes, core.binary_memory.VOTE_LIMIT)
+        memory.forget_many(key, -value)  # Votes past the limit were dropped, so withdrawals under-count
+        np.testing.assert_array_equal(memory.votes, core.binary_memory.VOTE_LIMIT - 1)
+
+        memory.encode(key[0], value[0], regularization=0.5)
+        self.assertEqual(memory.votes.dtype, np.float32)
+        np.testing.assert_allclose(memory.votes, core.binary_memory.VOTE_LIMIT - 2.5)
+
+    def test_popcount_fallback_without_bitwise_count(self):
+        packed = pack(to_bits(self.rng.standard_normal((4, 1000)), 1000))
+        bits = np.unpackbits(packed, axis=-1).sum(axis=-1)
+        np.testing.assert_array_equal(core.binary_memory._popcount_table(packed).sum(axis=-1), bits)
+        expected = hamming_similarity(packed[:, None], packed[None], 1000)
+        with mock.patch.object(core.binary_memory, "popcount", core.binary_memory._popcount_table):
+            np.testing.assert_array_equal(hamming_similarity(packed[:, None], packed[None], 1000), expected)
+
+    def test_registry_hands_out_binary_backend(self):
+        registry = HolographicMemoryRegistry()
+        memory = registry.acquire(memory_file=self.memory_file, dimensions=1024, backend="binary")
+        self.assertIsInstance(memory, BinaryHolographicMemory)
+        self.assertIs(registry.acquire(memory_file=self.memory_file, dimensions=1024, backend="binary"), memory)
+        memory.dynamic_encode(self.rng.standard_normal(1024), self.rng.standard_normal(1024))
+        registry.release(memory)
+        registry.release(memory)
+        self.assertTrue(os.path.exists(self.memory_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from utils.hyperdimensional_utils import NGramEncoder, decode_from_hyperdimensional, similarity
+
+
+class TestNGramEncoder(unittest.TestCase):
+    def test_batch_matches_rotate_multiply_bundle_definition(self):
+        encoder = NGramEncoder(dimensions=256, n=3, chunk_elements=256 * 4)
+        texts = ["add two numbers", "hi", "", "add two numbers!"]
+        batch = encoder.encode_many(texts)
+        for text, vector in zip(texts, batch):
+            symbols = encoder.symbols(text)
+            expected = np.zeros(256)
+            for start in range(len(symbols) - 2):
+                gram = np.ones(256)
+                for position in range(3):
+                    gram *= np.roll(encoder.item_memory[symbols[start + position]], position)
+                expected += gram
+            np.testing.assert_array_equal(vector, expected)
+
+    def test_similar_texts_get_similar_vectors(self):
+        for mode in ("char", "word"):
+            encoder = NGramEncoder(dimensions=4096, n=2, mode=mode)
+            query, close, far = encoder.encode_many(["solve the physics problem about force",
+                                                     "solve a physics problem about force",
+                                                     "print hello world in python"])
+            scores = similarity(query, [close, far])
+            self.assertGreater(scores[0], 0.5)
+            self.assertLess(abs(scores[1]), 0.2)
+
+    def test_decode_picks_most_similar_candidate(self):
+        candidates = ["count to five", "spell the word cat", "capital of france"]
+        vector = NGramEncoder(dimensions=2048).encode("spell the word 'cat'")
+        self.assertEqual(decode_from_hyperdimensional(vector, candidates, dimensions=2048), "spell the word cat")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,477 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import memory_store
+from memory_store import MemoryStore, MemoryStoreManager, content_hash, default_trace_file
+from core.holographic_memory import HolographicMemory
+from core.item_memory import ItemMemory
+from core.write_behind import WriteBehindQueue
+from core.vector_index import LSHIndex
+from rebuild_traces import rebuild_traces
+from reset_system import reset_database
+
+
+class TestMemoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "knowledge.db")
+        self.memory_file = os.path.join(self.tmpdir.name, "trace.npy")
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_retrieve_holographic_returns_stored_output(self):
+        facts = [("Spell 'cat'", "c-a-t"), ("What is water?", "H2O"), ("Capital of France", "Paris")]
+        for input_data, output_data in facts:
+            self.store.store_knowledge(input_data, output_data, "english")
+        for input_data, output_data in facts:
+            self.assertEqual(self.store.retrieve_holographic(input_data), output_data)
+            self.assertEqual(self.store.recall(input_data)[0]["output"], output_data)
+
+    def test_store_knowledge_many_matches_row_by_row_storage(self):
+        facts = [("Spell 'cat'", "c-a-t", "english"), ("What is water?", {"formula": "H2O"}, "science"),
+                 ("Capital of France", "Paris", "english")]
+        row_ids = self.store.store_knowledge_many(facts)
+        self.assertEqual(self.store.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        stored = self.store.conn.execute("SELECT id, output, domain FROM knowledge ORDER BY id").fetchall()
+        self.assertEqual([row[0] for row in stored], row_ids)
+        self.assertEqual(stored[1][1:], ('{"formula": "H2O"}', "science"))
+        self.assertEqual(self.store.retrieve_holographic("Capital of France"), "Paris")
+        self.assertEqual(self.store.similar("What is water", k=1)[0]["id"], row_ids[1])
+
+    def test_lookup_and_keyset_paginated_experiences(self):
+        self.store.store_knowledge_many([(f"task {i}", f"result {i}", "math" if i % 2 else "english")
+                                         for i in range(7)])
+        self.assertEqual(self.store.lookup("task 3", "math")["output"], "result 3")
+        self.assertIsNone(self.store.lookup("task 3", "english"))
+        self.assertEqual(self.store.lookup("task 4")["domain"], "english")
+        plan = self.store.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM knowledge WHERE domain = ? AND input = ?",
+                                       ("math", "task 3")).fetchall()
+        self.assertIn("idx_knowledge_domain_input", str(plan))
+        plan = self.store.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM knowledge WHERE input = ? ORDER BY id DESC",
+                                       ("task 3",)).fetchall()
+        self.assertIn("idx_knowledge_input", str(plan))
+        plan = self.store.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM knowledge WHERE domain = ? "
+                                       "AND (timestamp, id) > (?, ?) ORDER BY timestamp, id LIMIT ?",
+                                       ("math", "2000-01-01 00:00:00", 0, 2)).fetchall()
+        self.assertIn("idx_knowledge_domain_timestamp", str(plan))
+        self.assertNotIn("TEMP B-TREE", str(plan))
+
+        streamed = list(self.store.iter_experiences(batch_size=2))
+        self.assertEqual([row["input"] for row in streamed], [f"task {i}" for i in range(7)])
+        self.assertEqual(len(list(self.store.iter_experiences(domain="math", batch_size=2))), 3)
+        self.assertEqual(list(self.store.iter_experiences(since="2999-01-01 00:00:00")), [])
+        self.assertEqual(self.store.retrieve_experiences(limit=1)[0]["input"], "task 6")
+
+    def test_similar_finds_near_duplicate_inputs_and_survives_reopen(self):
+        self.store.store_knowledge("Solve a physics problem involving force", "F = m * a", "science")
+        self.store.store_knowledge("Spell the word 'cat'", "c-a-t", "english")
+        self.store.store_knowledge("Create a loop to count to 5", "for i in range(1, 6): print(i)", "python")
+        best = self.store.similar("Solve a physics problem about force", k=1)[0]
+        self.assertEqual(best["output"], "F = m * a")
+        self.assertEqual(self.store.similar("Spell the word 'dog'", k=1)[0]["output"], "c-a-t")
+        self.assertNotIn("c-a-t", [match["output"] for match in self.store.similar("Spell the word 'dog'", domain="python")])
+
+        self.store.close()
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.assertEqual(self.store.similar("Spell the word 'cat'", k=1)[0]["output"], "c-a-t")
+
+    def test_rebuild_traces_recovers_and_redimensions_from_the_database(self):
+        facts = [("Spell 'cat'", "c-a-t"), ("What is water?", "H2O"), ({"type": "addition", "a": 2, "b": 3}, "5")]
+        for input_data, output_data in facts:
+            self.store.store_knowledge(input_data, output_data, "english")
+        self.store.close()
+        os.remove(self.memory_file)
+
+        self.assertEqual(rebuild_traces(self.db_path, memory_file=self.memory_file, dimensions=4096, workers=1), 3)
+        self.store = MemoryStore(self.db_path, holographic_dimensions=4096, holographic_memory_file=self.memory_file)
+        for input_data, output_data in facts:
+            self.assertEqual(self.store.retrieve_holographic(input_data), output_data)
+
+    def test_rebuild_traces_covers_every_database_sharing_the_trace(self):
+        other_path = os.path.join(self.tmpdir.name, "other.db")
+        other = MemoryStore(other_path, holographic_memory_file=self.memory_file)
+        self.store.store_knowledge("Capital of France", "Paris", "english")
+        other.store_knowledge("What is water?", "H2O", "science")
+        other.close()
+        self.store.close()
+
+        self.assertEqual(rebuild_traces([self.db_path, other_path], memory_file=self.memory_file, workers=1), 2)
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        other = MemoryStore(other_path, holographic_memory_file=self.memory_file)
+        self.assertEqual(self.store.retrieve_holographic("Capital of France"), "Paris")
+        self.assertEqual(other.retrieve_holographic("What is water?"), "H2O")
+        other.close()
+        with self.assertRaises(ValueError):
+            rebuild_traces(self.db_path, memory_file="data/holographic_memory.npy")
+
+    def test_eviction_after_a_rebuild_subtracts_exactly(self):
+        facts = [("Capital of France", "Paris", "english"), ("What is water?", "H2O", "science"),
+                 ({"type": "addition", "a": 2, "b": 3}, "5", "math")]
+        self.store.store_knowledge_many(facts)
+        self.store.close()
+        rebuild_traces(self.db_path, memory_file=self.memory_file, workers=1)
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file, retention={"math": {"max_rows": 0}})
+        self.assertEqual(self.store.apply_retention(), 1)
+
+        reference = MemoryStore(os.path.join(self.tmpdir.name, "reference.db"),
+                                holographic_memory_file=os.path.join(self.tmpdir.name, "reference.npy"))
+        reference.store_knowledge_many(facts[:2])
+        np.testing.assert_allclose(self.store.holographic_memory.memory_space,
+                                   reference.holographic_memory.memory_space, atol=1e-9)
+        reference.close()
+
+    def test_default_trace_is_per_database_and_rebuildable(self):
+        # Rows of a store that used a shared trace are re-encoded into its own trace on first open
+        self.store.store_knowledge("Capital of France", "Paris", "english")
+        self.store.close()
+        self.store = MemoryStore(self.db_path)
+        self.assertEqual(self.store.holographic_memory.memory_file, default_trace_file(self.db_path))
+        self.assertEqual(self.store.retrieve_holographic("Capital of France"), "Paris")
+        self.store.store_knowledge("What is water?", "H2O", "science")
+        self.store.close()
+
+        os.remove(default_trace_file(self.db_path))
+        self.assertEqual(rebuild_traces(self.db_path, memory_file=default_trace_file(self.db_path), workers=1), 2)
+        self.store = MemoryStore(self.db_path)
+        self.assertEqual(self.store.item_memory.count, 2)  # Nothing encoded twice
+        self.assertEqual(self.store.retrieve_holographic("What is water?"), "H2O")
+
+    def test_write_behind_queue_persists_on_flush(self):
+        store = MemoryStore(os.path.join(self.tmpdir.name, "async.db"), write_behind=True, write_queue_size=4,
+                            holographic_memory_file=os.path.join(self.tmpdir.name, "async.npy"))
+        for i in range(20):
+            store.store_knowledge(f"task {i}", f"result {i}", "math")
+        store.flush()
+        self.assertEqual(len(list(store.iter_experiences())), 20)
+        self.assertEqual(store.lookup("task 19", "math")["output"], "result 19")
+        self.assertEqual(store.retrieve_holographic("task 7"), "result 7")
+        store.store_knowledge("task 20", "result 20", "math")
+        store.close()
+        reopened = MemoryStore(os.path.join(self.tmpdir.name, "async.db"),
+                               holographic_memory_file=os.path.join(self.tmpdir.name, "async.npy"))
+        self.assertEqual(reopened.lookup("task 20", "math")["output"], "result 20")
+        reopened.close()
+
+    def test_write_behind_queue_is_drained_at_exit_without_close(self):
+        db_path = os.path.join(self.tmpdir.name, "exit.db")
+        memory_file = os.path.join(self.tmpdir.name, "exit.npy")
+        script = ("from memory_store import MemoryStore\n"
+                  f"store = MemoryStore({db_path!r}, holographic_memory_file={memory_file!r}, write_behind=True)\n"
+                  "for i in range(50):\n"
+                  "    store.store_knowledge(f'task {i}', f'result {i}', 'math')\n")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-c", script], cwd=root, check=True, capture_output=True)
+        # Encoded and saved before exit, not just committed
+        self.assertEqual(ItemMemory(memory_file=os.path.join(self.tmpdir.name, "exit_items.npz")).count, 50)
+        reopened = MemoryStore(db_path, holographic_memory_file=memory_file)
+        self.assertEqual(len(list(reopened.iter_experiences())), 50)
+        self.assertEqual(reopened.retrieve_holographic("task 42"), "result 42")
+        reopened.close()
+
+    def test_legacy_table_without_domain_column_is_migrated(self):
+        db_path = os.path.join(self.tmpdir.name, "math.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE knowledge (id INTEGER PRIMARY KEY, input TEXT, output TEXT, "
+                     "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.executemany("INSERT INTO knowledge (input, output) VALUES (?, ?)", [("2 + 3", "5"), ("2 + 3", "5")])
+        conn.commit()
+        conn.close()
+        store = MemoryStore(db_path, holographic_memory_file=os.path.join(self.tmpdir.name, "math.npy"))
+        self.assertEqual(store.lookup("2 + 3")["hit_count"], 2)
+        self.assertTrue(store.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_knowledge_content_hash'").fetchone())
+        self.assertEqual(len(store.input_index.row_ids), 1)
+        store.store_knowledge("3 + 4", "7", "math")
+        self.assertEqual(store.lookup("3 + 4", "math")["output"], "7")
+        store.close()
+
+    def test_reopening_indexes_only_rows_missing_from_the_index(self):
+        self.store.store_knowledge("Capital of France", "Paris", "english")
+        self.store.close()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO knowledge (input, output, domain) VALUES ('Capital of Italy', 'Rome', 'english')")
+        conn.commit()
+        conn.close()
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.assertEqual(len(self.store.input_index.row_ids), 2)
+        self.assertEqual(self.store.similar("Capital of Italy", k=1)[0]["output"], "Rome")
+
+    def test_missing_index_is_rebuilt_in_chunks(self):
+        self.store.store_knowledge_many([(f"task {i}", f"result {i}", "math") for i in range(7)])
+        self.store.close()
+        os.remove(os.path.join(self.tmpdir.name, "knowledge_index.npz"))
+        with mock.patch.object(memory_store, "BACKFILL_CHUNK_SIZE", 3), \
+                mock.patch.object(LSHIndex, "add_many", autospec=True, side_effect=LSHIndex.add_many) as add_many:
+            self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.assertEqual([len(call.args[2]) for call in add_many.call_args_list], [3, 3, 1])
+        self.assertEqual(self.store.similar("task 6", k=1)[0]["output"], "result 6")
+
+    def test_rows_committed_but_never_encoded_are_recovered_on_open(self):
+        self.store.store_knowledge("Capital of France", "Paris", "english")
+        self.store.close()
+        # A crash after the commit but before the trace and cleanup memory were saved
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO knowledge (input, output, domain, content_hash, last_seen) "
+                     "VALUES ('Capital of Italy', 'Rome', 'english', ?, CURRENT_TIMESTAMP)",
+                     (content_hash("Capital of Italy", "Rome", "english"),))
+        conn.commit()
+        conn.close()
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.store.store_knowledge("Capital of Italy", "Rome", "english")  # Only bumps hit_count
+        self.assertEqual(self.store.item_memory.count, 2)
+        self.assertEqual(self.store.retrieve_holographic("Capital of Italy"), "Rome")
+        self.assertEqual(self.store.retrieve_holographic("Capital of France"), "Paris")
+
+    def test_sidecars_of_a_reset_database_are_discarded(self):
+        self.store.store_knowledge_many([("Capital of France", "Paris", "english"), ("What is water?", "H2O", "science")])
+        self.store.close()
+        # A reset that recreates the table itself leaves sidecars whose row ids restart at 1
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE knowledge")
+        conn.execute("DROP TABLE knowledge_meta")
+        conn.execute("CREATE TABLE knowledge (id INTEGER PRIMARY KEY, input TEXT, output TEXT, domain TEXT, "
+                     "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.commit()
+        conn.close()
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.assertEqual(self.store.item_memory.count, 0)
+        self.assertEqual(len(self.store.input_index.row_ids), 0)
+        self.store.store_knowledge("Capital of Italy", "Rome", "english")
+        self.assertEqual(self.store.recall("Capital of Italy")[0]["output"], "Rome")
+        self.store.close()
+
+        # reset_database removes the sidecars and recreates the full schema
+        reset_database(self.db_path)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "knowledge_items.npz")))
+        self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.assertEqual(self.store.item_memory.count, 0)
+        self.store.store_knowledge_many([("Capital of Spain", "Madrid", "english")])
+        self.assertEqual(self.store.lookup("Capital of Spain")["hit_count"], 1)
+        self.assertEqual(list(self.store.item_memory.row_ids), [1])
+
+    def test_rows_missing_from_the_trace_are_encoded_in_chunks(self):
+        self.store.store_knowledge_many([(f"task {i}", f"result {i}", "math") for i in range(7)])
+        self.store.close()
+        os.remove(self.memory_file)  # A new trace: every row is encoded again
+        with mock.patch.object(memory_store, "BACKFILL_CHUNK_SIZE", 3), \
+                mock.patch.object(HolographicMemory, "dynamic_encode_many", autospec=True,
+                                  side_effect=HolographicMemory.dynamic_encode_many) as encode_many:
+            self.store = MemoryStore(self.db_path, holographic_memory_file=self.memory_file)
+        self.assertEqual([len(call.args[1]) for call in encode_many.call_args_list], [3, 3, 1])
+        self.assertEqual(list(self.store.item_memory.row_ids), list(range(1, 8)))
+        self.assertEqual(self.store.retrieve_holographic("task 5"), "result 5")
+
+    def test_repeated_facts_are_upserted_once(self):
+        for _ in range(3):
+            self.store.store_knowledge("Result from SuperEntity1", "30", "math")
+        row_ids = self.store.store_knowledge_many([("Result from SuperEntity1", "30", "math"),
+                                                   ("Result from SuperEntity2", "12", "math"),
+                                                   ("Result from SuperEntity2", "12", "math")])
+        self.assertEqual(row_ids[1], row_ids[2])
+        self.assertEqual(self.store.conn.execute("SELECT count(*) FROM knowledge").fetchone()[0], 2)
+        self.assertEqual(self.store.item_memory.count, 2)  # Repeats are not encoded again
+        frequent = self.store.frequent_experiences("math")
+        self.assertEqual([(row["id"], row["hit_count"]) for row in frequent], [(row_ids[0], 4), (row_ids[1], 2)])
+        self.assertEqual(self.store.retrieve_holographic("Result from SuperEntity1"), "30")
+
+    def test_duplicates_in_an_existing_database_are_merged(self):
+        db_path = os.path.join(self.tmpdir.name, "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE knowledge (id INTEGER PRIMARY KEY, input TEXT, output TEXT, domain TEXT, "
+                     "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.executemany("INSERT INTO knowledge (input, output, domain) VALUES (?, ?, ?)",
+                         [("2 + 3", "5", "math")] * 3 + [("Spell 'cat'", "c-a-t", "english")])
+        conn.commit()
+        conn.close()
+        store = MemoryStore(db_path, holographic_memory_file=os.path.join(self.tmpdir.name, "legacy.npy"))
+        self.assertEqual(store.lookup("2 + 3", "math")["hit_count"], 3)
+        store.store_knowledge("2 + 3", "5", "math")
+        self.assertEqual(store.lookup("2 + 3", "math")["hit_count"], 4)
+        self.assertEqual(store.conn.execute("SELECT count(*) FROM knowledge").fetchone()[0], 2)
+        store.close()
+
+    def test_retention_evicts_expired_rows_and_their_trace(self):
+        store = MemoryStore(os.path.join(self.tmpdir.name, "retained.db"),
+                            holographic_memory_file=os.path.join(self.tmpdir.name, "retained.npy"),
+                            retention={"math": {"ttl": 3600}, "*": {"max_rows": 2}})
+        baseline = store.holographic_memory.memory_space.copy()
+        store.store_knowledge_many([(f"task {i}", f"result {i}", "math") for i in range(5)])
+        store.store_knowledge_many([(f"word {i}", f"meaning {i}", "english") for i in range(4)])
+        store.conn.execute("UPDATE knowledge SET last_seen = datetime('now', '-2 hours') WHERE input IN ('task 0', 'task 1')")
+        store.conn.commit()
+
+        self.assertEqual(store.apply_retention(batch_size=1), 4)
+        remaining = {row["input"] for row in store.iter_experiences()}
+        self.assertEqual(remaining, {"task 2", "task 3", "task 4", "word 2", "word 3"})
+        self.assertEqual(store.item_memory.count, 5)
+        self.assertEqual(len(store.input_index.row_ids), 5)
+        self.assertNotIn("task 0", [match["input"] for match in store.similar("task 0", k=5)])
+        self.assertEqual(store.retrieve_holographic("task 3"), "result 3")
+
+        # Rows the trace is not known to hold (here: dropped from the cleanup memory) are never subtracted
+        store.item_memory.remove_many([store.lookup("word 3")["id"]])
+        store.holographic_memory.forget_many(store._text_to_vector("word 3")[None],
+                                             store._text_to_vector("meaning 3")[None])
+        # Subtracting every remaining pair brings the trace back to where it started
+        store.retention = {"*": {"max_rows": 0}}
+        self.assertEqual(store.apply_retention(), 5)
+        np.testing.assert_allclose(store.holographic_memory.memory_space, baseline, atol=1e-9)
+        self.assertEqual(store.conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        store.close()
+
+    def test_full_text_search_ranks_and_follows_changes(self):
+        db_path = os.path.join(self.tmpdir.name, "search.db")
+        memory_file = os.path.join(self.tmpdir.name, "search.npy")
+        store = MemoryStore(db_path, holographic_memory_file=memory_file)
+        store.store_knowledge("Describe the process of photosynthesis",
+                              "Green plants use sunlight to synthesize foods from carbon dioxide and water.", "science")
+        store.close()
+
+        # Enabling the index on an existing database indexes the rows already stored
+        store = MemoryStore(db_path, holographic_memory_file=memory_file, full_text=True)
+        store.store_knowledge_many([("What is the chemical formula for water?", "H2O", "science"),
+                                    ("Automate a process to simulate photosynthesis",
+                                     "def photosynthesis(light, water, co2): return 'glucose'", "python"),
+                                    ("Spell 'cat'", "c-a-t", "english")])
+        results = store.search("anything about photosynthesis")
+        self.assertEqual({row["domain"] for row in results}, {"science", "python"})
+        self.assertGreater(results[0]["score"], 0)
+        self.assertEqual([row["domain"] for row in store.search("photosynthesis", domain="python")], ["python"])
+        self.assertEqual(store.search("plant")[0]["input"], "Describe the process of photosynthesis")
+        self.assertEqual(store.search('water" OR *'), store.search("water"))
+
+        store.conn.execute("DELETE FROM knowledge WHERE domain = 'python'")
+        store.conn.commit()
+        self.assertEqual([row["domain"] for row in store.search("photosynthesis")], ["science"])
+        store.close()
+        with self.assertRaises(ValueError):
+            self.store.search("water")
+
+    def test_store_manager_shares_one_store_per_database(self):
+        manager = MemoryStoreManager()
+        db_path = os.path.join(self.tmpdir.name, "shared.db")
+        memory_file = os.path.join(self.tmpdir.name, "shared.npy")
+        first = manager.acquire(db_path, holographic_memory_file=memory_file)
+        second = manager.acquire(os.path.join(self.tmpdir.name, ".", "shared.db"))
+        self.assertIs(first, second)
+        first.store_knowledge("What is water?", "H2O", "science")
+        manager.release(first)
+        self.assertEqual(second.lookup("What is water?", "science")["output"], "H2O")
+        manager.release(second)
+        self.assertIsNone(second.holographic_memory)  # The last release closes the store
+        self.assertIsNot(manager.acquire(db_path, holographic_memory_file=memory_file), first)
+        manager.close_all()
+
+    def test_store_manager_rejects_conflicting_options(self):
+        manager = MemoryStoreManager()
+        db_path = os.path.join(self.tmpdir.name, "shared.db")
+        memory_file = os.path.join(self.tmpdir.name, "shared.npy")
+        store = manager.acquire(db_path, holographic_memory_file=memory_file)
+        self.assertIs(manager.acquire(db_path, holographic_memory_file=memory_file, full_text=False), store)
+        with self.assertRaises(ValueError):
+            manager.acquire(db_path, full_text=True)
+        with self.assertRaises(ValueError):
+            manager.acquire(db_path, holographic_memory_file=os.path.join(self.tmpdir.name, "other.npy"))
+        manager.release(store)
+        manager.release(store)
+        self.assertTrue(manager.acquire(db_path, holographic_memory_file=memory_file, full_text=True).full_text)
+        manager.close_all()
+
+    def test_connections_are_per_thread_and_reused(self):
+        connections = []
+        def worker():
+            connections.append(self.store.conn)
+            self.store.store_knowledge(f"threaded task {len(connections)}", "threaded result", "math")
+        for _ in range(3):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        self.assertIsNot(connections[0], self.store.conn)
+        self.assertIs(connections[0], connections[1])  # A finished thread's connection is handed on
+        self.assertEqual(self.store._pool.size, 2)
+        self.assertEqual(self.store.conn.execute("SELECT count(*) FROM knowledge").fetchone()[0], 3)
+
+    def test_concurrent_writers_keep_sidecars_aligned(self):
+        def worker(thread):
+            for batch in range(5):
+                self.store.store_knowledge_many([(f"task {thread}.{batch}.{i}", f"result {thread}.{batch}.{i}", f"d{thread}")
+                                                 for i in range(20)])
+        threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        outputs = dict(self.store.conn.execute("SELECT id, output FROM knowledge"))
+        self.assertEqual(len(outputs), 600)
+        self.assertEqual(sorted(self.store.item_memory.row_ids), sorted(outputs))
+        self.assertEqual(sorted(self.store.input_index.row_ids), sorted(outputs))
+        for row_id, output in zip(self.store.item_memory.row_ids, self.store.item_memory._outputs):
+            self.assertEqual(outputs[row_id], output)
+
+    def test_failed_commits_are_reported_and_not_encoded(self):
+        store = MemoryStore(os.path.join(self.tmpdir.name, "failing.db"), write_behind=True,
+                            holographic_memory_file=os.path.join(self.tmpdir.name, "failing.npy"))
+        trace = store.holographic_memory.memory_space.copy()
+        store.conn.execute("DROP TABLE knowledge")
+        store.store_knowledge("task", "result", "math")
+        with self.assertRaises(RuntimeError):
+            store.flush()
+        self.store.conn.execute("DROP TABLE knowledge")
+        self.store.store_knowledge("task", "result", "math")
+        self.assertEqual(self.store.store_knowledge_many([("task", "result", "math")]), [])
+        for failed in (store, self.store):
+            self.assertEqual(failed.item_memory.count, 0)
+            self.assertEqual(len(failed.input_index.row_ids), 0)
+        np.testing.assert_array_equal(store.holographic_memory.memory_space, trace)
+        store.store_knowledge("another task", "another result", "math")
+        with self.assertRaises(RuntimeError):
+            store.close()
+        self.assertIsNone(store.holographic_memory)  # Cleanup still ran
+
+    def test_binary_backend_recalls_stored_output(self):
+        store = MemoryStore(os.path.join(self.tmpdir.name, "binary.db"), holographic_backend="binary",
+                            holographic_memory_file=os.path.join(self.tmpdir.name, "binary.npz"))
+        store.store_knowledge("What is water?", "H2O", "science")
+        store.store_knowledge("Capital of France", "Paris", "english")
+        self.assertEqual(store.retrieve_holographic("Capital of France"), "Paris")
+        store.close()
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def test_writes_racing_close_are_persisted_or_rejected(self):
+        persisted = []
+        writes = WriteBehindQueue(persisted.extend, max_pending=8, batch_size=4)
+        accepted = []
+        def writer(thread):
+            for i in range(10000):
+                try:
+                    writes.put((thread, i))
+                except RuntimeError:
+                    return
+                accepted.append((thread, i))
+        threads = [threading.Thread(target=writer, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        while len(accepted) < 100:
+            time.sleep(0.001)
+        writes.close()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(persisted), sorted(accepted))
+        self.assertTrue(writes.flush(timeout=5))
+        self.assertEqual(writes.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import gc
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from core.item_memory import ItemMemory
+from core.memory_registry import release_memory
+from core.normal_entity import NormalEntity
+
+
+class TestNormalEntity(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)  # Entities keep their files under data/
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def test_repeated_pairs_are_stored_once(self):
+        entity = NormalEntity("MathEntity", domain="math")
+        entity.store_knowledge({"type": "addition", "a": 2, "b": 3}, 5)
+        trace = entity.holographic_memory.memory_space.copy()
+        entity.store_knowledge({"b": 3, "a": 2, "type": "addition"}, 5)
+        np.testing.assert_array_equal(entity.holographic_memory.memory_space, trace)
+        self.assertEqual(entity.item_memory.count, 1)
+        entity.item_memory.flush()
+
+        # Retraining after a restart does not stack the pair again either
+        restarted = NormalEntity("MathEntity", domain="math")
+        restarted.store_knowledge({"type": "addition", "a": 2, "b": 3}, 5)
+        restarted.store_knowledge({"type": "addition", "a": 2, "b": 3}, "5")  # A different output
+        self.assertEqual(restarted.item_memory.count, 2)
+        self.assertEqual(restarted.retrieve_knowledge({"type": "addition", "a": 2, "b": 3}), 5)
+        release_memory(entity.holographic_memory)
+        release_memory(restarted.holographic_memory)
+
+    def test_trace_is_saved_before_the_item_memory(self):
+        entity = NormalEntity("MathEntity", domain="math")
+        entity.store_knowledge({"type": "addition", "a": 2, "b": 3}, 5)
+        holographic_memory = entity.holographic_memory
+        saved = []
+        with mock.patch.object(type(holographic_memory), "flush", lambda memory: saved.append("trace")), \
+                mock.patch.object(ItemMemory, "flush", lambda memory: saved.append("items")):
+            del entity
+            gc.collect()
+        self.assertEqual(saved, ["trace", "items"])
+        release_memory(holographic_memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+from utils.text_encoder import TextEncoder
+
+
+class TestTextEncoder(unittest.TestCase):
+    def test_vectors_match_across_processes_and_leave_global_rng_alone(self):
+        np.random.seed(123)
+        expected_draw = np.random.rand()
+        np.random.seed(123)
+        vector = TextEncoder(dimensions=64).encode("What is water?")
+        self.assertEqual(np.random.rand(), expected_draw)
+
+        script = ("from utils.text_encoder import TextEncoder; "
+                  "print(TextEncoder(dimensions=64).encode('What is water?').tolist())")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONHASHSEED="7", PYTHONPATH=root)
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, check=True)
+        np.testing.assert_array_equal(np.array(eval(output.stdout)), vector)
+
+    def test_batch_encoding_matches_single_and_uses_cache(self):
+        encoder = TextEncoder(dimensions=32, cache_size=8)
+        texts = ["a", {"b": 1, "a": 2}, 3, "a"]
+        batch = encoder.encode_texts(texts)
+        for row, text in enumerate(texts):
+            np.testing.assert_array_equal(batch[row], encoder.encode(text))
+        np.testing.assert_array_equal(encoder.encode({"a": 2, "b": 1}), batch[1])
+        self.assertGreater(encoder.cache_info().hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,159 @@
+import re
+import hashlib
+import threading
 import numpy as np
+from scipy.sparse import csr_matrix
+from utils.text_encoder import canonical_text, DEFAULT_KEY
 
-def encode_to_hyperdimensional(vector, dimensions=16384):
-    """Encode a vector into hyperdimensional space."""
-    return np.random.randn(dimensions)
+# Padding symbol for texts shorter than one n-gram (UTF-8 never produces byte 0 for printable text)
+PAD_SYMBOL = 0
+# Split words on runs of word characters, keeping punctuation as separate tokens
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
 
-def decode_from_hyperdimensional(vector):
-    """Decode a vector from hyperdimensional space."""
-    return np.round(vector[:5], 3)  # Simplified decoding for demonstration
\ No newline at end of file
+
+class NGramEncoder:
+    def __init__(self, dimensions=16384, n=3, mode="char", seed=0, chunk_elements=1 << 22):
+        """
+        Compositional hyperdimensional encoder: every symbol (UTF-8 byte or word) has a fixed bipolar
+        base vector, the i-th symbol of an n-gram is bound to its position by rotating its base vector
+        i places, an n-gram is the elementwise product of its rotated symbols, and a text is the sum
+        (bundle) of its n-grams. Texts sharing n-grams get similar vectors.
+        :param dimensions: Length of the hypervectors.
+        :param n: Symbols per n-gram.
+        :param mode: "char" (n-grams over UTF-8 bytes) or "word" (n-grams over word tokens).
+        :param seed: Seed of the byte item memory ("char" mode).
+        :param chunk_elements: Max n-grams x dimensions materialized at once while bundling.
+        """
+        if mode not in ("char", "word"):
+            raise ValueError(f"Unknown n-gram mode '{mode}'. Use 'char' or 'word'.")
+        self.dimensions = dimensions
+        self.n = n
+        self.mode = mode
+        self.chunk_elements = chunk_elements
+        self._lock = threading.Lock()
+        if mode == "char":
+            rng = np.random.default_rng(seed)
+            self.item_memory = rng.integers(0, 2, size=(256, dimensions), dtype=np.int8) * 2 - 1
+        else:
+            self.item_memory = np.empty((0, dimensions), dtype=np.int8)
+            self._symbols = {}  # word -> row of item_memory
+            self._add_words([""])  # Row 0 doubles as the padding symbol
+
+    def _add_words(self, words):
+        """Append base vectors for unseen words, each derived from a keyed digest of the word."""
+        rows = []
+        for word in words:
+            if word in self._symbols:
+                continue
+            digest = hashlib.blake2b(word.encode("utf-8"), key=DEFAULT_KEY, digest_size=16).digest()
+            rng = np.random.default_rng(int.from_bytes(digest, "little"))
+            self._symbols[word] = len(self._symbols)
+            rows.append(rng.integers(0, 2, size=self.dimensions, dtype=np.int8) * 2 - 1)
+        if rows:
+            self.item_memory = np.concatenate([self.item_memory, np.stack(rows)])
+
+    def symbols(self, text):
+        """
+        Index array of the symbols of a text into the item memory, padded to at least n symbols
+        (empty texts stay empty).
+        """
+        text = canonical_text(text)
+        if self.mode == "char":
+            indices = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.intp)
+        else:
+            words = WORD_PATTERN.findall(text.lower())
+            with self._lock:
+                self._add_words(words)
+                indices = np.fromiter((self._symbols[word] for word in words), dtype=np.intp, count=len(words))
+        if 0 < len(indices) < self.n:
+            indices = np.concatenate([indices, np.full(self.n - len(indices), PAD_SYMBOL, dtype=np.intp)])
+        return indices
+
+    def encode(self, text):
+        """
+        Encode one input into a hypervector.
+        :param text: Input text (or any value, encoded through its canonical text form).
+        :return: Bundled n-gram vector (1D float array of length dimensions).
+        """
+        return self.encode_many([text])[0]
+
+    def encode_many(self, texts):
+        """
+        Encode a batch of inputs in one vectorized pass over all of their n-grams.
+        :param texts: Iterable of inputs.
+        :return: 2D float array with one hypervector per input.
+        """
+        sequences = [self.symbols(text) for text in texts]
+        vectors = np.zeros((len(sequences), self.dimensions))
+        gram_counts = np.array([max(len(sequence) - self.n + 1, 0) for sequence in sequences], dtype=np.intp)
+        if gram_counts.sum() == 0:
+            return vectors
+
+        # Symbols of every n-gram (one row each) and the text owning it
+        symbols = np.concatenate(sequences)
+        offsets = np.concatenate([[0], np.cumsum([len(sequence) for sequence in sequences])[:-1]])
+        owners = np.repeat(np.arange(len(sequences)), gram_counts)
+        starts = np.repeat(offsets, gram_counts) + (np.arange(gram_counts.sum())
+                                                    - np.repeat(np.cumsum(gram_counts) - gram_counts, gram_counts))
+        grams = symbols[starts[:, None] + np.arange(self.n)]
+
+        # Bundling is linear, so build each distinct n-gram once and sum with a sparse count matrix
+        unique_grams, inverse = np.unique(grams, axis=0, return_inverse=True)
+        counts = csr_matrix((np.ones(len(grams), dtype=np.float32), (owners, inverse.ravel())),
+                            shape=(len(sequences), len(unique_grams)))
+        chunk = max(1, self.chunk_elements // self.dimensions)
+        for begin in range(0, len(unique_grams), chunk):
+            block = unique_grams[begin:begin + chunk]
+            gram_vectors = self.item_memory[block[:, 0]]
+            for position in range(1, self.n):
+                gram_vectors *= np.roll(self.item_memory[block[:, position]], position, axis=1)
+            vectors += counts[:, begin:begin + chunk] @ gram_vectors.astype(np.float32)
+        return vectors
+
+
+# Shared encoders per (dimensions, n, mode)
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_ngram_encoder(dimensions=16384, n=3, mode="char"):
+    """Return the process-wide shared NGramEncoder for a configuration."""
+    with _encoders_lock:
+        key = (dimensions, n, mode)
+        if key not in _encoders:
+            _encoders[key] = NGramEncoder(dimensions=dimensions, n=n, mode=mode)
+        return _encoders[key]
+
+
+def encode_to_hyperdimensional(vector, dimensions=16384, n=3, mode="char"):
+    """
+    Encode an input into hyperdimensional space with the shared n-gram encoder.
+    Texts are encoded directly; arrays and other values through their canonical text form.
+    """
+    if isinstance(vector, np.ndarray):
+        vector = np.round(vector, 3).tolist()
+    return get_ngram_encoder(dimensions, n, mode).encode(vector)
+
+
+def encode_many_to_hyperdimensional(texts, dimensions=16384, n=3, mode="char"):
+    """Encode a batch of inputs with the shared n-gram encoder (see NGramEncoder.encode_many)."""
+    return get_ngram_encoder(dimensions, n, mode).encode_many(texts)
+
+
+def similarity(vector, vectors):
+    """Cosine similarity between a hypervector and one or more hypervectors."""
+    vectors = np.atleast_2d(vectors)
+    norms = np.linalg.norm(vectors, axis=-1) * np.linalg.norm(vector)
+    return (vectors @ vector) / np.where(norms > 0, norms, 1)
+
+
+def decode_from_hyperdimensional(vector, candidates=None, dimensions=16384, n=3, mode="char"):
+    """
+    Decode a vector from hyperdimensional space.
+    With candidates, return the candidate whose encoding is most similar to the vector;
+    otherwise return a short numeric summary of it.
+    """
+    if candidates is None:
+        return np.round(vector[:5], 3)
+    scores = similarity(vector, encode_many_to_hyperdimensional(candidates, dimensions, n, mode))
+    return candidates[int(np.argmax(scores))]
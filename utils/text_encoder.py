@@ -0,0 +1,86 @@
+# utils/text_encoder.py
+
+import json
+import hashlib
+import functools
+import numpy as np
+
+# Default BLAKE2 key; change it to get an independent family of text vectors
+DEFAULT_KEY = b"em-nexus-text-encoder"
+
+
+def canonical_text(text):
+    """
+    Turn any input into the string that gets encoded: strings as-is, lists and dictionaries as
+    sorted-key JSON (so equal dictionaries encode identically), anything else through str().
+    """
+    if isinstance(text, str):
+        return text
+    if isinstance(text, (list, tuple, dict)):
+        return json.dumps(text, sort_keys=True, default=str)
+    return str(text)
+
+
+class TextEncoder:
+    def __init__(self, dimensions=1024, key=DEFAULT_KEY, cache_size=4096):
+        """
+        Map texts to Gaussian hypervectors that are identical across processes and runs.
+        Each text seeds its own np.random.Generator from a keyed BLAKE2 digest, so the global
+        np.random state is never touched and concurrent callers do not interfere.
+        :param dimensions: Length of the generated vectors.
+        :param key: BLAKE2 key (up to 64 bytes) the digests are derived with.
+        :param cache_size: Number of recent vectors kept in the LRU cache (0 disables caching).
+        """
+        self.dimensions = dimensions
+        self.key = key
+        self._cached_vector = functools.lru_cache(maxsize=cache_size)(self._generate)
+
+    def seed(self, text):
+        """128-bit seed of a canonical text."""
+        digest = hashlib.blake2b(text.encode("utf-8"), key=self.key, digest_size=16).digest()
+        return int.from_bytes(digest, "little")
+
+    def _generate(self, text):
+        vector = np.random.default_rng(self.seed(text)).standard_normal(self.dimensions)
+        vector.flags.writeable = False  # Cached vectors are shared between callers
+        return vector
+
+    def encode(self, text):
+        """
+        Encode one input into a (read-only) vector.
+        :param text: Input text (a string, list, dictionary, or anything with a str() form).
+        :return: Vector of length dimensions.
+        """
+        return self._cached_vector(canonical_text(text))
+
+    def encode_texts(self, texts):
+        """
+        Encode a batch of inputs.
+        :param texts: Iterable of inputs.
+        :return: 2D array with one vector per input.
+        """
+        texts = [canonical_text(text) for text in texts]
+        vectors = np.empty((len(texts), self.dimensions))
+        for row, text in enumerate(texts):
+            vectors[row] = self._cached_vector(text)
+        return vectors
+
+    def cache_info(self):
+        """Hit/miss statistics of the LRU cache."""
+        return self._cached_vector.cache_info()
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(dimensions=1024):
+    """Return the process-wide shared TextEncoder for a vector length."""
+    return TextEncoder(dimensions=dimensions)
+
+
+def encode_text(text, dimensions=1024):
+    """Encode one input with the shared encoder (see TextEncoder.encode)."""
+    return get_encoder(dimensions).encode(text)
+
+
+def encode_texts(texts, dimensions=1024):
+    """Encode a batch of inputs with the shared encoder (see TextEncoder.encode_texts)."""
+    return get_encoder(dimensions).encode_texts(texts)